@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,6 +11,33 @@ class Settings(BaseModel):
     aws_secret_access_key: str | None = os.getenv("AWS_SECRET_ACCESS_KEY")
     aws_region: str = os.getenv("AWS_REGION", "us-east-1")
     s3_athena_output: str = os.getenv("S3_ATHENA_OUTPUT", "s3://<your-bucket>/athena-results/")
+    athena_workgroup: str = os.getenv("ATHENA_WORKGROUP", "primary")
+
+    # Reutilización de resultados: del lado de Athena (workgroup con engine v3; 0 = apagado;
+    # acotada al TTL de cada entrada) y, como respaldo, índice (sql, params) -> QueryExecutionId
+    # en el cache compartido, que vive lo mismo que la entrada (tope ATHENA_RESULT_INDEX_MAX_AGE)
+    athena_result_reuse_minutes: int = int(os.getenv("ATHENA_RESULT_REUSE_MINUTES", "60"))
+    athena_result_index_max_age: int = int(os.getenv("ATHENA_RESULT_INDEX_MAX_AGE", "86400"))
+
+    # Reintentos de pyathena ante throttling de StartQueryExecution (backoff exponencial)
+    athena_retry_attempts: int = int(os.getenv("ATHENA_RETRY_ATTEMPTS", "5"))
+
+    # Query builder (app/utils/sql.py): columna de partición por fecha de cada tabla
+    # ("db.tabla=columna,…") y columnas de texto ya verificadas con scripts/scan_report.py
+    # para filtrarse en su tipo crudo ("db.tabla.columna,…"; vacío = forma CAST original)
+    athena_date_partitions: str = os.getenv("ATHENA_DATE_PARTITIONS", "")
+    athena_raw_predicates: str = os.getenv("ATHENA_RAW_PREDICATES", "")
+
+    # Control de admisión: queries simultáneas a Athena y topes por endpoint, ambos en total
+    # para todos los workers (cada proceso toma su parte según WEB_CONCURRENCY, la misma
+    # variable que usa uvicorn como default de --workers), y cola acotada por proceso
+    admission_max_concurrency: int = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "8"))
+    admission_workers: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    admission_endpoint_limits: str = os.getenv(
+        "ADMISSION_ENDPOINT_LIMITS", "telemetry=4,demand=4,plants=3,stations=3,export=2"
+    )
+    admission_max_queue: int = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+    admission_max_wait: float = float(os.getenv("ADMISSION_MAX_WAIT", "15"))
 
     # SSL corporativo: pon "true" para verificar, "false" si rompe por certificados internos
     athena_verify_ssl: bool = os.getenv("ATHENA_VERIFY_SSL", "false").lower() == "true"
@@ -17,4 +45,30 @@ class Settings(BaseModel):
     # CORS (para permitir la UI local)
     cors_allowed_origins: str = os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:8501")
 
+    # Cache compartido entre workers (sqlite | redis | memory | none)
+    cache_backend: str = os.getenv("CACHE_BACKEND", "sqlite")
+    cache_path: str = os.getenv("CACHE_PATH", os.path.join(tempfile.gettempdir(), "jpp_cache.sqlite3"))
+    cache_url: str = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+    cache_max_mb: int = int(os.getenv("CACHE_MAX_MB", "256"))
+    cache_default_ttl: int = int(os.getenv("CACHE_DEFAULT_TTL", "900"))
+
+    # Índice de búsqueda de estaciones (toda la red): antigüedad máxima en segundos
+    station_index_max_age: int = int(os.getenv("STATION_INDEX_MAX_AGE", "3600"))
+
+    # Scheduler en segundo plano (índice de búsqueda + precarga); "false" sólo para
+    # benchmarks o tests que no deben tocar Athena (/stations/search queda en 503)
+    scheduler_enabled: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+
+    # Precarga al iniciar y refresco periódico de datos "calientes"
+    warmup_enabled: bool = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    warmup_plant_ids: str = os.getenv("WARMUP_PLANT_IDS", "")       # ej: "1202,1210"
+    warmup_top_plants: int = int(os.getenv("WARMUP_TOP_PLANTS", "3"))  # + las más consultadas
+    warmup_max_stations: int = int(os.getenv("WARMUP_MAX_STATIONS", "60"))
+    warmup_concurrency: int = int(os.getenv("WARMUP_CONCURRENCY", "2"))
+    warmup_interval: int = int(os.getenv("WARMUP_INTERVAL", "900"))
+
+    # Perfilado por request (X-Profile: 1 / ?profile=1): intervalo de muestreo y retención
+    profile_sample_interval_ms: int = int(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+    profile_ttl: int = int(os.getenv("PROFILE_TTL", "3600"))
+
 settings = Settings()
@@ -0,0 +1,233 @@
+# backend/app/deps/admission.py
+"""
+Control de admisión para queries que van a Athena.
+
+Athena tiene una cuota de queries concurrentes por cuenta: una ráfaga de
+/telemetry/summary no debe dejar a /plants esperando detrás ni terminar en
+errores de throttling como 500 genéricos. Cada ejecución real (no los hits
+de cache) pide un cupo:
+
+- tope total (ADMISSION_MAX_CONCURRENCY) y por endpoint
+  (ADMISSION_ENDPOINT_LIMITS) para la cuenta: cada worker de uvicorn toma
+  su parte según WEB_CONCURRENCY, así N workers no suman N veces el tope;
+- clases de prioridad: interactivo > batch / planta completa > segundo plano
+  (precarga, precarga especulativa del frontend con `X-Request-Priority:
+  background`). Las clases bajas sólo pueden ocupar una fracción del tope y
+  nunca el último cupo, de modo que siempre queda espacio para el diálogo
+  interactivo;
+- cola de espera acotada (ADMISSION_MAX_QUEUE) con espera máxima
+  (ADMISSION_MAX_WAIT): si está llena, la request nueva desplaza a la última
+  en espera de una clase más baja o, si no la hay, recibe 429; si se agota la
+  espera 503, ambos con Retry-After;
+- el throttling de Athena que persiste después de los reintentos de
+  pyathena se responde como 503 con Retry-After.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from itertools import count
+from typing import Any, Iterator
+
+from fastapi import Depends, HTTPException, Request
+
+from ..config import settings
+from .cache import flight_group
+from .profiling import phase
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BATCH = 1
+    BACKGROUND = 2
+
+
+# Fracción del tope global que puede ocupar cada clase
+SHARE = {Priority.INTERACTIVE: 1.0, Priority.BATCH: 0.75, Priority.BACKGROUND: 0.5}
+
+# Header con el que un cliente marca requests especulativas (sólo puede bajar la prioridad)
+PRIORITY_HEADER = "X-Request-Priority"
+
+THROTTLING_ERRORS = ("ThrottlingException", "TooManyRequestsException")
+
+_priority: ContextVar[Priority] = ContextVar("query_priority", default=Priority.BATCH)
+_endpoint: ContextVar[str] = ContextVar("query_endpoint", default="other")
+
+
+class Overloaded(HTTPException):
+    """429/503 con Retry-After; los routers la dejan pasar tal cual (no es un 500)."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+
+
+def query_class(endpoint: str, priority: Priority = Priority.INTERACTIVE):
+    """
+    Dependencia de ruta que clasifica las queries de la request. Es async a
+    propósito: corre en el task de la request y el contextvar llega al
+    threadpool donde se ejecuta el endpoint sync.
+    """
+    async def _set_class(request: Request) -> None:
+        _endpoint.set(endpoint)
+        if request.headers.get(PRIORITY_HEADER, "").lower() == "background":
+            _priority.set(Priority.BACKGROUND)
+        else:
+            _priority.set(priority)
+        flight_group.set(int(_priority.get()))
+
+    return Depends(_set_class)
+
+
+@contextmanager
+def priority(value: Priority, endpoint: str | None = None) -> Iterator[None]:
+    """Clasifica las queries ejecutadas en este contexto (p. ej. la precarga)."""
+    tokens = [(_priority, _priority.set(value)), (flight_group, flight_group.set(int(value)))]
+    if endpoint is not None:
+        tokens.append((_endpoint, _endpoint.set(endpoint)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def _per_worker(total: int, workers: int) -> int:
+    return max(1, total // max(1, workers))
+
+
+def _parse_limits(raw: str) -> dict[str, int]:
+    out = {}
+    for item in raw.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            if value.strip().isdigit():
+                out[name.strip()] = int(value)
+    return out
+
+
+class AdmissionController:
+    def __init__(self, capacity: int, limits: dict[str, int], max_queue: int, max_wait: float, workers: int = 1):
+        # Mínimo 2: el último cupo queda siempre para las interactivas
+        self.capacity = max(2, capacity)
+        self.workers = workers
+        self._caps = {
+            p: self.capacity if p == Priority.INTERACTIVE
+            else max(1, min(self.capacity - 1, int(self.capacity * SHARE[p])))
+            for p in Priority
+        }
+        self.limits = limits
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._running = 0
+        self._by_endpoint: Counter[str] = Counter()
+        self._waiting: list[tuple[int, int, str]] = []  # (prioridad, llegada, endpoint)
+        self._displaced: set[tuple[int, int, str]] = set()
+        self._seq = count()
+        self._avg_s = 5.0  # duración promedio (EWMA) de una query, para Retry-After
+        self.rejected = 0
+        self.timed_out = 0
+        self.throttled = 0
+
+    def _allowed(self, prio: int, endpoint: str) -> bool:
+        if self._running >= self._caps[Priority(prio)]:
+            return False
+        limit = self.limits.get(endpoint)
+        return limit is None or self._by_endpoint[endpoint] < limit
+
+    def _my_turn(self, ticket: tuple[int, int, str]) -> bool:
+        # Pasa el primero de la cola (prioridad, luego orden de llegada) que pueda correr
+        for t in sorted(self._waiting):
+            if self._allowed(t[0], t[2]):
+                return t == ticket
+        return False
+
+    def retry_after(self) -> int:
+        backlog = len(self._waiting) + 1
+        return min(60, max(1, math.ceil(self._avg_s * backlog / self.capacity)))
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        prio, endpoint = _priority.get(), _endpoint.get()
+        with phase("athena.admission"), self._cond:
+            if len(self._waiting) >= self.max_queue:
+                # Cola llena: sale la última en llegar de la clase más baja, si es más baja que ésta
+                victim = max(self._waiting)
+                if victim[0] <= int(prio):
+                    self.rejected += 1
+                    raise Overloaded(429, "Too many queued Athena queries, retry later", self.retry_after())
+                self._waiting.remove(victim)
+                self._displaced.add(victim)
+                self._cond.notify_all()
+            ticket = (int(prio), next(self._seq), endpoint)
+            self._waiting.append(ticket)
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while not self._my_turn(ticket):
+                    if ticket in self._displaced:
+                        self._displaced.discard(ticket)
+                        self.rejected += 1
+                        raise Overloaded(429, "Too many queued Athena queries, retry later", self.retry_after())
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        raise Overloaded(503, "Athena capacity busy, retry later", self.retry_after())
+                    self._cond.wait(remaining)
+            finally:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                self._cond.notify_all()
+            self._running += 1
+            self._by_endpoint[endpoint] += 1
+
+        t0 = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if any(name in str(e) for name in THROTTLING_ERRORS):
+                with self._cond:
+                    self.throttled += 1
+                raise Overloaded(503, "Athena is throttling queries, retry later", self.retry_after()) from e
+            raise
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._by_endpoint[endpoint] -= 1
+                self._avg_s = 0.8 * self._avg_s + 0.2 * (time.monotonic() - t0)
+                self._cond.notify_all()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "workers": self.workers,
+                "running": self._running,
+                "waiting": len(self._waiting),
+                "by_endpoint": {k: v for k, v in self._by_endpoint.items() if v},
+                "avg_query_s": round(self._avg_s, 2),
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "throttled": self.throttled,
+            }
+
+
+admission = AdmissionController(
+    capacity=_per_worker(settings.admission_max_concurrency, settings.admission_workers),
+    limits={
+        name: _per_worker(limit, settings.admission_workers)
+        for name, limit in _parse_limits(settings.admission_endpoint_limits).items()
+    },
+    max_queue=settings.admission_max_queue,
+    max_wait=settings.admission_max_wait,
+    workers=settings.admission_workers,
+)
+
+
+def query_slot():
+    """Cupo para ejecutar una query en Athena (usar como context manager)."""
+    return admission.slot()
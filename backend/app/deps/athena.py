@@ -1,15 +1,213 @@
-from pyathena import connect
+# pandas, pyathena y boto3 se importan recién en la primera query: el proceso
+# arranca (y responde /health) sin pagar esos imports.
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
 from ..config import settings
+from .admission import THROTTLING_ERRORS, query_slot
+from .cache import get_cache, is_refreshing
+from .profiling import phase, record_query
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# Se apaga sola si el workgroup no soporta result reuse (engine v2)
+_reuse_supported = settings.athena_result_reuse_minutes > 0
+
+def _connect_params() -> dict:
+    from pyathena.util import RetryConfig
 
-def get_athena_connection():
     params = dict(
         s3_staging_dir=settings.s3_athena_output,
         region_name=settings.aws_region,
-        verify=settings.athena_verify_ssl
+        work_group=settings.athena_workgroup,
+        verify=settings.athena_verify_ssl,
+        # StartQueryExecution con cuota llena: reintento con backoff exponencial
+        retry_config=RetryConfig(
+            exceptions=THROTTLING_ERRORS,
+            attempt=settings.athena_retry_attempts,
+            multiplier=1,
+            max_delay=30,
+            exponential_base=2,
+        ),
     )
     if settings.aws_access_key_id and settings.aws_secret_access_key:
         params.update(
             aws_access_key_id=settings.aws_access_key_id,
             aws_secret_access_key=settings.aws_secret_access_key
         )
+    return params
+
+# Conexiones (y sus clientes boto3) creadas una vez por proceso, en el primer uso.
+# Los clientes boto3 son thread-safe: cada query usa su propio cursor.
+_clients: dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+def _singleton(name: str, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+def _new_connection(cursor_class=None):
+    from pyathena import connect
+
+    params = _connect_params()
+    if cursor_class is not None:
+        params["cursor_class"] = cursor_class
     return connect(**params)
+
+def get_athena_connection():
+    return _singleton("athena", _new_connection)
+
+def get_athena_arrow_connection():
+    """Conexión cuyos cursores entregan resultados como pyarrow.Table (sin pasar por pandas)."""
+    def _factory():
+        from pyathena.arrow.cursor import ArrowCursor
+        return _new_connection(ArrowCursor)
+    return _singleton("athena_arrow", _factory)
+
+def _reuse_kwargs(max_age: float | None = None) -> dict:
+    """
+    Result reuse de Athena con antigüedad máxima de min(ATHENA_RESULT_REUSE_MINUTES,
+    max_age): un resultado reutilizado nunca es más viejo que el TTL de la entrada.
+    Apagado en un refresco forzado (refreshing()) y si max_age es menor a 1 minuto.
+    """
+    if not _reuse_supported or is_refreshing():
+        return {}
+    minutes = settings.athena_result_reuse_minutes
+    if max_age is not None:
+        minutes = min(minutes, int(max_age // 60))
+    if minutes < 1:
+        return {}
+    return dict(result_reuse_enable=True, result_reuse_minutes=minutes)
+
+def execute_with_reuse(cursor, sql: str, params: dict | None, max_age: float | None = None) -> None:
+    """cursor.execute con result reuse de Athena (hasta max_age segundos) cuando el workgroup lo permite."""
+    global _reuse_supported
+    kwargs = _reuse_kwargs(max_age)
+    try:
+        cursor.execute(sql, params, **kwargs)
+    except Exception as e:
+        if not kwargs or "reuse" not in str(e).lower():
+            raise
+        log.warning("Athena result reuse not available in workgroup %s: %s", settings.athena_workgroup, e)
+        _reuse_supported = False
+        cursor.execute(sql, params)
+
+def _run_query(sql: str, params: dict | None, max_age: float | None = None) -> tuple[pd.DataFrame, dict]:
+    import pandas as pd
+
+    with query_slot():
+        with phase("athena.connect"):
+            cur = get_athena_connection().cursor()
+        with phase("athena.execute"):
+            execute_with_reuse(cur, sql, params, max_age)
+        record_query(cur)
+        with phase("athena.fetch"):
+            columns = [d[0] for d in cur.description or []]
+            df = pd.DataFrame.from_records(cur.fetchall(), columns=columns, coerce_float=True)
+        return df, {"query_id": cur.query_id, "output_location": cur.output_location}
+
+# --- Releer un resultado existente (S3) en vez de volver a ejecutar ---------
+
+_INT_TYPES = {"tinyint", "smallint", "integer", "bigint"}
+_FLOAT_TYPES = {"float", "real", "double", "decimal"}
+
+def _boto_client(service: str):
+    def _factory():
+        import boto3
+
+        kwargs = {"region_name": settings.aws_region}
+        if settings.aws_access_key_id and settings.aws_secret_access_key:
+            kwargs.update(
+                aws_access_key_id=settings.aws_access_key_id,
+                aws_secret_access_key=settings.aws_secret_access_key,
+            )
+        return boto3.session.Session(**kwargs).client(service, verify=settings.athena_verify_ssl)
+    return _singleton(f"boto3.{service}", _factory)
+
+def _read_result(ref: dict, max_age: float) -> pd.DataFrame | None:
+    """
+    Lee el CSV de resultados de una ejecución previa. Retorna None si la
+    ejecución ya no sirve (no terminó bien, terminó hace más de max_age
+    segundos o el archivo fue borrado).
+    """
+    import pandas as pd
+
+    athena = _boto_client("athena")
+    qe = athena.get_query_execution(QueryExecutionId=ref["query_id"])["QueryExecution"]
+    if qe["Status"]["State"] != "SUCCEEDED":
+        return None
+    completed = qe["Status"].get("CompletionDateTime")
+    if completed is None or (datetime.now(timezone.utc) - completed).total_seconds() > max_age:
+        return None
+    location = qe.get("ResultConfiguration", {}).get("OutputLocation") or ref["output_location"]
+    info = athena.get_query_results(QueryExecutionId=ref["query_id"], MaxResults=1)
+    types = {c["Name"]: c["Type"].lower() for c in info["ResultSet"]["ResultSetMetadata"]["ColumnInfo"]}
+
+    bucket, key = location.removeprefix("s3://").split("/", 1)
+    body = _boto_client("s3").get_object(Bucket=bucket, Key=key)["Body"]
+    df = pd.read_csv(body, dtype=str, keep_default_na=False, na_values=[""])
+
+    # Mismos tipos que entrega el cursor de pyathena
+    for col, typ in types.items():
+        if col not in df.columns:
+            continue
+        if typ in _INT_TYPES or typ in _FLOAT_TYPES:
+            df[col] = pd.to_numeric(df[col])
+        elif typ == "boolean":
+            df[col] = df[col].map({"true": True, "false": False})
+        elif typ == "date":
+            df[col] = pd.to_datetime(df[col]).dt.date
+        elif typ.startswith("timestamp"):
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+def read_sql(sql: str, params: dict | None = None, ttl: float | None = None):
+    """
+    Ejecuta la query en Athena y retorna un DataFrame, pasando por el cache
+    compartido: la misma (sql, params) no vuelve a Athena mientras no expire
+    el TTL, sin importar qué worker la calculó. ttl=0 desactiva el cache.
+
+    Si el DataFrame ya no está en cache (desalojo, reinicio, worker nuevo)
+    pero hay una ejecución idéntica que terminó dentro del TTL (y de
+    ATHENA_RESULT_INDEX_MAX_AGE), se relee su CSV de S3 en lugar de pagar la
+    query de nuevo; nunca se sirve un resultado más viejo que el TTL del
+    llamador. Un refresco forzado (refreshing()) siempre re-ejecuta.
+    """
+    cache = get_cache()
+    key = cache.make_key("sql", sql, params or {})
+    index_key = cache.make_key("sql_execution", sql, params or {})
+    reuse_age = cache.default_ttl if ttl is None else ttl
+
+    def _run():
+        ref = None if is_refreshing() else cache.get(index_key)
+        if isinstance(ref, dict):
+            try:
+                with phase("athena.reread"):
+                    df = _read_result(ref, reuse_age)
+                if df is not None:
+                    return df
+            except Exception as e:
+                log.info("stale Athena result %s, re-running: %s", ref.get("query_id"), e)
+            cache.delete(index_key)
+
+        df, ref = _run_query(sql, params, reuse_age)
+        if ref["query_id"] and ref["output_location"]:
+            # Sirve tras un desalojo o un reinicio, nunca más allá del TTL del llamador
+            cache.set(index_key, ref, ttl=min(settings.athena_result_index_max_age, reuse_age))
+        return df
+
+    with phase("read_sql"):
+        if ttl == 0:
+            return _run_query(sql, params, 0)[0]
+        return cache.get_or_set(key, _run, ttl)
@@ -0,0 +1,417 @@
+# backend/app/deps/cache.py
+"""
+Cache compartido para resultados de Athena y curvas calculadas.
+
+Por defecto usa un archivo SQLite local (WAL + mmap) que comparten todos los
+workers de uvicorn de la misma máquina: un resultado calculado por un worker
+queda disponible para el resto. Cada entrada tiene TTL y el tamaño total está
+acotado (se desalojan primero las expiradas y luego las menos usadas).
+
+Backends (CACHE_BACKEND):
+- sqlite  → archivo local compartido (default)
+- redis   → red, requiere el paquete `redis` y CACHE_URL
+- memory  → sólo en proceso (útil en tests como reemplazo del backend de red)
+- none    → sin cache
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Protocol
+
+from ..config import settings
+
+log = logging.getLogger(__name__)
+
+MISS = object()
+
+# Dentro de refreshing(), get_or_set recalcula y sobrescribe en vez de leer
+_refresh: ContextVar[bool] = ContextVar("cache_refresh", default=False)
+
+
+@contextmanager
+def refreshing() -> Iterator[None]:
+    """Fuerza a recalcular (y volver a cachear) todo lo pedido vía get_or_set en este contexto."""
+    token = _refresh.set(True)
+    try:
+        yield
+    finally:
+        _refresh.reset(token)
+
+
+def is_refreshing() -> bool:
+    return _refresh.get()
+
+
+# Grupo de single-flight (la clase de admisión): get_or_set sólo espera un
+# cálculo en vuelo del mismo grupo, así una request interactiva no queda
+# detrás de una precarga que todavía espera cupo de segundo plano
+flight_group: ContextVar[int] = ContextVar("cache_flight_group", default=0)
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> bytes | None: ...
+    def set(self, key: str, value: bytes, ttl: float) -> None: ...
+    def add(self, key: str, value: bytes, ttl: float) -> bool: ...
+    def delete(self, key: str) -> None: ...
+    def clear(self) -> None: ...
+
+
+class NullBackend:
+    def get(self, key: str) -> bytes | None:
+        return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        pass
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return True
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class MemoryBackend:
+    """LRU en memoria con TTL y límite de bytes (un solo proceso)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.time():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (time.time() + ttl, value)
+            self._size += len(value)
+            while self._size > self.max_bytes and self._data:
+                self._pop(next(iter(self._data)))
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > time.time():
+                return False
+            self._pop(key)
+            self._data[key] = (time.time() + ttl, value)
+            self._size += len(value)
+            while self._size > self.max_bytes and len(self._data) > 1:
+                self._pop(next(iter(self._data)))
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def _pop(self, key: str) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._size -= len(item[1])
+
+
+class SQLiteBackend:
+    """Archivo SQLite compartido entre procesos, con TTL y desalojo LRU por tamaño."""
+
+    # Un hit sólo reescribe accessed_at si el último registro tiene más de esto
+    # (segundos): los hits no toman el lock de escritura en cada lectura
+    TOUCH_INTERVAL = 60.0
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key         TEXT PRIMARY KEY,
+                value       BLOB NOT NULL,
+                size        INTEGER NOT NULL,
+                expires_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries(accessed_at)")
+        # Tamaño total mantenido por triggers (evita SUM(size) en cada escritura)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY CHECK (id = 1), total INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO stats(id, total) SELECT 1, COALESCE(SUM(size), 0) FROM entries")
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_ins AFTER INSERT ON entries "
+                "BEGIN UPDATE stats SET total = total + new.size WHERE id = 1; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_del AFTER DELETE ON entries "
+                "BEGIN UPDATE stats SET total = total - old.size WHERE id = 1; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_upd AFTER UPDATE OF size ON entries "
+                "BEGIN UPDATE stats SET total = total - old.size + new.size WHERE id = 1; END"
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA mmap_size=67108864")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> bytes | None:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, accessed_at FROM entries WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[1] > self.TOUCH_INTERVAL:
+            try:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            except sqlite3.OperationalError:
+                pass  # lock ocupado más allá del timeout: se sirve el hit igual
+        return row[0]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        conn = self._conn()
+        # Upsert (no INSERT OR REPLACE): el REPLACE borra sin disparar el trigger de DELETE
+        conn.execute(
+            """
+            INSERT INTO entries(key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value, size = excluded.size,
+                expires_at = excluded.expires_at, accessed_at = excluded.accessed_at
+            """,
+            (key, sqlite3.Binary(value), len(value), now + ttl, now),
+        )
+        self._evict(conn, now)
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        now = time.time()
+        conn = self._conn()
+        # Atómico entre procesos: sólo escribe si no existe o si la entrada ya expiró
+        cur = conn.execute(
+            """
+            INSERT INTO entries(key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value, size = excluded.size,
+                expires_at = excluded.expires_at, accessed_at = excluded.accessed_at
+            WHERE entries.expires_at <= ?
+            """,
+            (key, sqlite3.Binary(value), len(value), now + ttl, now, now),
+        )
+        return cur.rowcount > 0
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM entries")
+
+    def _total(self, conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT total FROM stats WHERE id = 1").fetchone()
+        return row[0] if row else 0
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        total = self._total(conn)
+        if total <= self.max_bytes:
+            return
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        total = self._total(conn)
+        if total <= self.max_bytes:
+            return
+        # Menos usadas primero hasta volver bajo el límite
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC"):
+            victims.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+
+class RedisBackend:
+    """Backend de red (opcional). El desalojo por tamaño lo hace Redis (maxmemory-policy)."""
+
+    def __init__(self, url: str):
+        import redis  # dependencia opcional
+
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> bytes | None:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._client.set(key, value, ex=max(1, int(ttl)))
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(self._client.set(key, value, ex=max(1, int(ttl)), nx=True))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(key)
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match="jpp:*"):
+            self._client.delete(key)
+
+
+class Cache:
+    """Fachada con serialización (pickle), claves estables y get_or_set con single-flight."""
+
+    def __init__(self, backend: CacheBackend, default_ttl: float, namespace: str = "jpp"):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.namespace = namespace
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def make_key(self, *parts: Any) -> str:
+        raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+        return f"{self.namespace}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Any:
+        try:
+            raw = self.backend.get(key)
+        except Exception as e:  # el cache nunca debe botar la request
+            log.warning("cache get failed: %s", e)
+            return MISS
+        if raw is None:
+            return MISS
+        try:
+            return pickle.loads(raw)
+        except Exception:
+            return MISS
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        try:
+            self.backend.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+        except Exception as e:
+            log.warning("cache set failed: %s", e)
+
+    def add(self, key: str, value: Any, ttl: float | None = None) -> bool:
+        """
+        Escribe sólo si la clave no existe (o expiró), de forma atómica entre
+        workers: sirve como lease. Si el cache falla retorna True (mejor
+        repetir trabajo que no hacerlo).
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        try:
+            return self.backend.add(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+        except Exception as e:
+            log.warning("cache add failed: %s", e)
+            return True
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            log.warning("cache delete failed: %s", e)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def get_or_set(self, key: str, fn: Callable[[], Any], ttl: float | None = None) -> Any:
+        """Retorna el valor cacheado o lo calcula una sola vez por proceso y grupo (single-flight)."""
+        force = _refresh.get()
+        value = MISS if force else self.get(key)
+        if value is not MISS:
+            return value
+        with self._key_lock(f"{key}#{flight_group.get()}"):
+            value = MISS if force else self.get(key)
+            if value is not MISS:
+                return value
+            value = fn()
+            self.set(key, value, ttl)
+            return value
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                if len(self._locks) > 1024:
+                    self._locks = {k: l for k, l in self._locks.items() if l.locked()}
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+
+def _build_backend() -> CacheBackend:
+    kind = settings.cache_backend.lower()
+    max_bytes = settings.cache_max_mb * 1024 * 1024
+    try:
+        if kind == "none":
+            return NullBackend()
+        if kind == "memory":
+            return MemoryBackend(max_bytes)
+        if kind == "redis":
+            return RedisBackend(settings.cache_url)
+        return SQLiteBackend(settings.cache_path, max_bytes)
+    except Exception as e:
+        log.warning("cache backend '%s' unavailable (%s); falling back to memory", kind, e)
+        return MemoryBackend(max_bytes)
+
+
+_cache: Cache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Cache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = Cache(_build_backend(), default_ttl=settings.cache_default_ttl)
+    return _cache
+
+
+def set_cache_backend(backend: CacheBackend) -> Cache:
+    """Reemplaza el backend (p. ej. MemoryBackend en tests en lugar de Redis)."""
+    global _cache
+    with _cache_lock:
+        _cache = Cache(backend, default_ttl=settings.cache_default_ttl)
+    return _cache
@@ -0,0 +1,251 @@
+# backend/app/deps/profiling.py
+"""
+Perfilado por request (opt-in).
+
+Con el header `X-Profile: 1` o el query param `profile=1` (y una API key
+válida), la request registra:
+
+- tiempos por fase (`phase("athena.execute")`, `phase("pandas")`, …) más los
+  tiempos que informa Athena (cola, motor) y los bytes escaneados;
+- un perfil muestreado del árbol de llamadas: un hilo lee
+  `sys._current_frames()` cada PROFILE_SAMPLE_INTERVAL_MS para los hilos que
+  trabajan en la request.
+
+El resultado se devuelve en `Server-Timing` y se guarda en el cache compartido
+(PROFILE_TTL), consultable en `/debug/profiles/{request_id}`. Sin el flag,
+`phase()` sólo lee un contextvar: el costo es despreciable.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from starlette.requests import Request
+
+from ..config import settings
+from .auth import API_KEY
+from .cache import get_cache
+
+REQUEST_ID_HEADER = "X-Request-Id"
+PROFILE_HEADER = "X-Profile"
+
+_current: ContextVar["Profile | None"] = ContextVar("profile", default=None)
+
+
+class Profile:
+    def __init__(self, request_id: str, method: str, path: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.total_ms: float | None = None
+        self.status: int | None = None
+        self.phases: list[dict[str, Any]] = []
+        self.queries: list[dict[str, Any]] = []
+        # Hilos dentro de una phase() de esta request (con anidamiento): sólo ésos se muestrean
+        self.threads: Counter[int] = Counter()
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    # -- registro -------------------------------------------------------
+    def add_phase(self, name: str, start: float, ms: float, source: str = "wall") -> None:
+        with self._lock:
+            self.phases.append({
+                "name": name,
+                "start_ms": round((start - self._t0) * 1000, 3),
+                "ms": round(ms, 3),
+                "source": source,
+                "thread": threading.current_thread().name,
+            })
+
+    def add_query(self, **info: Any) -> None:
+        with self._lock:
+            self.queries.append(info)
+
+    def register_thread(self) -> None:
+        with self._lock:
+            self.threads[threading.get_ident()] += 1
+
+    def unregister_thread(self) -> None:
+        # Los hilos del threadpool se reutilizan: al salir deja de muestrearse para esta request
+        tid = threading.get_ident()
+        with self._lock:
+            self.threads[tid] -= 1
+            if self.threads[tid] <= 0:
+                del self.threads[tid]
+
+    # -- muestreo -------------------------------------------------------
+    def start(self) -> None:
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profiler-{self.request_id}", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self.total_ms = round((time.perf_counter() - self._t0) * 1000, 3)
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+
+    def _sample_loop(self) -> None:
+        interval = max(1, settings.profile_sample_interval_ms) / 1000.0
+        while not self._stop.wait(interval):
+            frames = sys._current_frames()
+            with self._lock:
+                tids = list(self.threads)
+            for tid in tids:
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[tuple(reversed(stack))] += 1
+
+    # -- salida ---------------------------------------------------------
+    def totals(self) -> dict[str, float]:
+        out: dict[str, float] = defaultdict(float)
+        with self._lock:
+            for p in self.phases:
+                out[p["name"]] += p["ms"]
+        return dict(out)
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.totals().items()]
+        if self.total_ms is not None:
+            parts.append(f"total;dur={self.total_ms:.1f}")
+        return ", ".join(parts)
+
+    def _tree(self, min_share: float = 0.01) -> dict[str, Any]:
+        root: dict[str, Any] = {"name": "<request>", "samples": 0, "children": {}}
+        for stack, n in self.samples.items():
+            root["samples"] += n
+            node = root
+            for fn in stack:
+                node = node["children"].setdefault(fn, {"name": fn, "samples": 0, "children": {}})
+                node["samples"] += n
+        cutoff = max(1, int(root["samples"] * min_share))
+
+        def prune(node: dict[str, Any]) -> dict[str, Any]:
+            kids = sorted(node["children"].values(), key=lambda c: -c["samples"])
+            return {
+                "name": node["name"],
+                "samples": node["samples"],
+                "children": [prune(c) for c in kids if c["samples"] >= cutoff],
+            }
+
+        return prune(root)
+
+    def to_dict(self) -> dict[str, Any]:
+        interval = max(1, settings.profile_sample_interval_ms)
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "total_ms": self.total_ms,
+            "phase_totals_ms": self.totals(),
+            "phases": list(self.phases),
+            "queries": list(self.queries),
+            "sample_interval_ms": interval,
+            "samples": sum(self.samples.values()),
+            "call_tree": self._tree(),
+            # formato "collapsed" (a;b;c N) para flamegraph.pl / speedscope
+            "collapsed": [
+                f"{';'.join(stack)} {n}" for stack, n in self.samples.most_common(200)
+            ],
+        }
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Mide una fase de la request en curso (no hace nada si no se está perfilando)."""
+    prof = _current.get()
+    if prof is None:
+        yield
+        return
+    prof.register_thread()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        prof.add_phase(name, start, (time.perf_counter() - start) * 1000)
+        prof.unregister_thread()
+
+
+def record(name: str, ms: float | None) -> None:
+    """Agrega un tiempo informado por un servicio externo (p. ej. cola de Athena)."""
+    prof = _current.get()
+    if prof is not None and ms is not None:
+        prof.add_phase(name, time.perf_counter(), float(ms), source="reported")
+
+
+def record_query(cursor: Any) -> None:
+    """Tiempos y bytes que reporta Athena para la query recién ejecutada."""
+    prof = _current.get()
+    if prof is None:
+        return
+    queue_ms = getattr(cursor, "query_queue_time_in_millis", None)
+    engine_ms = getattr(cursor, "engine_execution_time_in_millis", None)
+    record("athena.queue", queue_ms)
+    record("athena.engine", engine_ms)
+    prof.add_query(
+        query_id=getattr(cursor, "query_id", None),
+        queue_ms=queue_ms,
+        engine_ms=engine_ms,
+        planning_ms=getattr(cursor, "query_planning_time_in_millis", None),
+        service_ms=getattr(cursor, "service_processing_time_in_millis", None),
+        scanned_bytes=getattr(cursor, "data_scanned_in_bytes", None),
+        reused=getattr(cursor, "reused_previous_result", None),
+    )
+
+
+def requested(request: Request) -> bool:
+    flag = request.headers.get(PROFILE_HEADER) or request.query_params.get("profile")
+    if not flag or flag.lower() not in ("1", "true", "yes"):
+        return False
+    return bool(API_KEY) and request.headers.get("x-api-key") == API_KEY
+
+
+def new_request_id(request: Request) -> str:
+    """
+    Id generado en el servidor (no se toma el X-Request-Id del cliente): es la
+    clave del perfil guardado, así nadie puede pisar ni adivinar el de otro.
+    """
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def profiling(request_id: str, method: str, path: str) -> Iterator[Profile]:
+    prof = Profile(request_id, method, path)
+    token = _current.set(prof)
+    prof.start()
+    try:
+        yield prof
+    finally:
+        prof.stop()
+        _current.reset(token)
+
+
+def _key(request_id: str) -> str:
+    return get_cache().make_key("profile", request_id)
+
+
+def save(prof: Profile) -> None:
+    get_cache().set(_key(prof.request_id), prof.to_dict(), ttl=settings.profile_ttl)
+
+
+def load(request_id: str) -> dict[str, Any] | None:
+    value = get_cache().get(_key(request_id))
+    return value if isinstance(value, dict) else None
@@ -0,0 +1,254 @@
+# backend/app/deps/warmup.py
+"""
+Precarga de datos "calientes" al iniciar y refresco periódico.
+
+Un scheduler liviano (un hilo daemon por proceso) ejecuta la precarga al
+arrancar y luego cada WARMUP_INTERVAL segundos: plantas, estaciones de las
+plantas configuradas + las más consultadas, y telemetría de sus estaciones.
+Las queries corren con a lo más WARMUP_CONCURRENCY en paralelo para no
+agotar la cuota de Athena, y el resultado queda en el cache compartido.
+Con varios workers, sólo uno toma el turno de precarga (lease en el cache).
+
+El mismo scheduler mantiene el índice de búsqueda de estaciones: es por
+proceso, así que cada worker lo construye (la query sale del cache compartido).
+Corre siempre, aunque la precarga esté desactivada.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from ..config import settings
+from .admission import Priority, priority
+from .cache import get_cache, refreshing
+
+log = logging.getLogger(__name__)
+
+USAGE_TTL = 30 * 24 * 3600
+USAGE_FLUSH_INTERVAL = 60
+
+# Consultas por planta aún no sumadas al cache compartido (ver flush_plant_usage)
+_usage: Counter[int] = Counter()
+_usage_lock = threading.Lock()
+
+
+def _usage_key() -> str:
+    return get_cache().make_key("plant_usage")
+
+
+def _lease_key() -> str:
+    return get_cache().make_key("warmup_lease")
+
+
+def _done_key() -> str:
+    return get_cache().make_key("warmup_last_ok")
+
+
+def track_plant_usage(plant_id: int) -> None:
+    """Cuenta una consulta a la planta en memoria (sin tocar el cache en la request)."""
+    with _usage_lock:
+        _usage[plant_id] += 1
+
+
+def flush_plant_usage() -> None:
+    """
+    Suma los conteos pendientes de este worker al total compartido. Corre en el
+    scheduler: una escritura por minuto y worker en vez de una por request (dos
+    workers que sumen a la vez todavía pueden pisarse un lote; se tolera).
+    """
+    with _usage_lock:
+        pending = dict(_usage)
+        _usage.clear()
+    if not pending:
+        return
+    cache = get_cache()
+    counts = cache.get(_usage_key())
+    counts = dict(counts) if isinstance(counts, dict) else {}
+    for plant_id, n in pending.items():
+        counts[plant_id] = counts.get(plant_id, 0) + n
+    cache.set(_usage_key(), counts, ttl=USAGE_TTL)
+
+
+def _hot_plants() -> list[int]:
+    configured = [int(p) for p in settings.warmup_plant_ids.split(",") if p.strip().isdigit()]
+    counts = get_cache().get(_usage_key())
+    counts = counts if isinstance(counts, dict) else {}
+    top = sorted(counts, key=lambda pid: -counts[pid])[: settings.warmup_top_plants]
+    return list(dict.fromkeys(configured + top))
+
+
+class WarmupState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = False
+        self.last_ok: float | None = None  # última precarga completada por este worker
+        self.runs = 0
+        self.last_started: float | None = None
+        self.last_finished: float | None = None
+        self.last_duration_s: float | None = None
+        self.last_error: str | None = None
+        self.plants: list[int] = []
+        self.stations = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "running": self.running,
+                "runs": self.runs,
+                "last_ok": self.last_ok,
+                "last_started": self.last_started,
+                "last_finished": self.last_finished,
+                "last_duration_s": self.last_duration_s,
+                "last_error": self.last_error,
+                "plants": list(self.plants),
+                "stations": self.stations,
+            }
+
+
+state = WarmupState()
+
+
+def is_ready() -> bool:
+    """
+    Listo cuando este worker u otro completó una precarga vigente. La marca de
+    este worker cubre el caso sin cache compartido (CACHE_BACKEND=none).
+    """
+    if not settings.warmup_enabled:
+        return True
+    with state.lock:
+        if state.last_ok is not None and time.time() - state.last_ok < settings.warmup_interval * 2:
+            return True
+    last_ok = get_cache().get(_done_key())
+    return isinstance(last_ok, float)
+
+
+def _refresh_call(fn: Callable, *args) -> Any:
+    with refreshing(), priority(Priority.BACKGROUND, endpoint="warmup"):
+        return fn(*args)
+
+
+def run_warmup() -> None:
+    """Una pasada de precarga (bloqueante). Fuerza refresco de lo que toca."""
+    # Import diferido: los routers importan este módulo (track_plant_usage)
+    from ..routers.plants import list_plants
+    from ..routers.stations import _load_plant_stations
+    from ..routers.telemetry import telemetry_summary
+
+    cache = get_cache()
+    # Set-if-absent atómico: con N workers arrancando a la vez sólo uno lo obtiene
+    if not cache.add(_lease_key(), time.time(), ttl=max(60, settings.warmup_interval // 2)):
+        log.info("warm-up skipped: another worker holds the lease")
+        return
+
+    with state.lock:
+        state.running = True
+        state.last_started = time.time()
+        state.last_error = None
+
+    t0 = time.perf_counter()
+    errors: list[str] = []
+    flush_plant_usage()
+    plants = _hot_plants()
+    n_stations = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, settings.warmup_concurrency), thread_name_prefix="warmup") as pool:
+            try:
+                _refresh_call(list_plants)
+            except Exception as e:
+                errors.append(f"plants: {e}")
+
+            stations_by_plant = {}
+            for pid, fut in [(pid, pool.submit(_refresh_call, _load_plant_stations, pid)) for pid in plants]:
+                try:
+                    stations_by_plant[pid] = fut.result()
+                except Exception as e:
+                    errors.append(f"stations {pid}: {e}")
+
+            client_ids = list(dict.fromkeys(
+                s.client_id for pid in plants for s in stations_by_plant.get(pid, [])
+            ))[: settings.warmup_max_stations]
+            futures = [pool.submit(_refresh_call, telemetry_summary, cid) for cid in client_ids]
+            for cid, fut in zip(client_ids, futures):
+                try:
+                    fut.result()
+                    n_stations += 1
+                except Exception as e:
+                    errors.append(f"telemetry {cid}: {e}")
+    except Exception as e:
+        errors.append(str(e))
+
+    ok = not errors or n_stations
+    if ok:
+        cache.set(_done_key(), time.time(), ttl=settings.warmup_interval * 2)
+
+    with state.lock:
+        if ok:
+            state.last_ok = time.time()
+        state.running = False
+        state.runs += 1
+        state.last_finished = time.time()
+        state.last_duration_s = round(time.perf_counter() - t0, 3)
+        state.plants = plants
+        state.stations = n_stations
+        state.last_error = "; ".join(errors[:5]) or None
+    log.info("warm-up done in %.1fs: %d plants, %d stations, %d errors",
+             state.last_duration_s, len(plants), n_stations, len(errors))
+
+
+def refresh_station_index() -> None:
+    """Construye o refresca (si está vencido) el índice de /stations/search en segundo plano."""
+    from ..routers.stations import station_index
+
+    with priority(Priority.BACKGROUND, endpoint="warmup"):
+        station_index.refresh_if_stale()
+
+
+class Scheduler:
+    """Scheduler mínimo en proceso: cada job corre al iniciar y luego cada 'interval' segundos."""
+
+    def __init__(self):
+        self._jobs: list[tuple[str, float, Callable[[], None]]] = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add_job(self, name: str, interval: float, fn: Callable[[], None]) -> None:
+        self._jobs.append((name, interval, fn))
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, name="jpp-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        next_run = {name: 0.0 for name, _, _ in self._jobs}
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for name, interval, fn in self._jobs:
+                if now >= next_run[name]:
+                    try:
+                        fn()
+                    except Exception as e:
+                        log.warning("scheduled job %s failed: %s", name, e)
+                    next_run[name] = time.monotonic() + interval
+            wait = min(next_run.values(), default=now + 60) - time.monotonic()
+            self._stop.wait(max(1.0, wait))
+
+
+def start_scheduler() -> Scheduler:
+    scheduler = Scheduler()
+    if not settings.scheduler_enabled:
+        log.info("scheduler disabled (SCHEDULER_ENABLED=false)")
+        return scheduler
+    # Revisa el índice seguido (sólo reconstruye si venció) para reintentar pronto tras un fallo
+    scheduler.add_job("station_index", max(60, settings.station_index_max_age // 10), refresh_station_index)
+    scheduler.add_job("plant_usage", USAGE_FLUSH_INTERVAL, flush_plant_usage)
+    if settings.warmup_enabled:
+        scheduler.add_job("warmup", settings.warmup_interval, run_warmup)
+    scheduler.start()
+    return scheduler
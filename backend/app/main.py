@@ -1,12 +1,24 @@
 # backend/app/main.py
-from fastapi import FastAPI, Depends  # <- añade Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Request  # <- añade Depends
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import settings
-from .routers import plants, stations, telemetry, demand
+from .routers import plants, stations, telemetry, demand, export, debug
 from .deps.auth import require_api_key
+from .deps import warmup
+from .deps.admission import admission
+from .deps import profiling
 
-app = FastAPI(title="JPP Backend", version="0.1.0", docs_url=None, redoc_url=None)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Índice de búsqueda + precarga y refresco periódico en segundo plano (no bloquea el arranque)
+    scheduler = warmup.start_scheduler()
+    yield
+    scheduler.stop()
+    warmup.flush_plant_usage()
+
+app = FastAPI(title="JPP Backend", version="0.1.0", docs_url=None, redoc_url=None, lifespan=lifespan)
 
 # Ajuste CORS: si usas "*", no permitas credentials
 allow_origins = (
@@ -22,12 +34,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    # Sin X-Profile sólo se agrega X-Request-Id (costo despreciable)
+    request_id = profiling.new_request_id(request)
+    if not profiling.requested(request):
+        response = await call_next(request)
+        response.headers[profiling.REQUEST_ID_HEADER] = request_id
+        return response
+
+    with profiling.profiling(request_id, request.method, request.url.path) as prof:
+        response = await call_next(request)
+    prof.status = response.status_code
+    profiling.save(prof)
+    response.headers[profiling.REQUEST_ID_HEADER] = request_id
+    response.headers["Server-Timing"] = prof.server_timing()
+    response.headers["X-Profile-Url"] = f"/debug/profiles/{request_id}"
+    return response
+
 @app.get("/health", dependencies=[Depends(require_api_key)])  # protege /health (opcional)
 def health():
-    return {"ok": True}
+    # ready=False mientras ningún worker haya completado la precarga
+    return {
+        "ok": True,
+        "ready": warmup.is_ready(),
+        "warmup": warmup.state.snapshot(),
+        "admission": admission.snapshot(),
+    }
 
 # protege routers completos
 app.include_router(plants.router, dependencies=[Depends(require_api_key)])
 app.include_router(stations.router, dependencies=[Depends(require_api_key)])
 app.include_router(telemetry.router, dependencies=[Depends(require_api_key)]) 
-app.include_router(demand.router, dependencies=[Depends(require_api_key)])
\ No newline at end of file
+app.include_router(demand.router, dependencies=[Depends(require_api_key)])
+app.include_router(export.router, dependencies=[Depends(require_api_key)])
+app.include_router(debug.router, dependencies=[Depends(require_api_key)])
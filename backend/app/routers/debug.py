@@ -0,0 +1,12 @@
+from fastapi import APIRouter, HTTPException, Path
+
+from ..deps import profiling
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+@router.get("/profiles/{request_id}")
+def get_profile(request_id: str = Path(..., description=f"Valor de {profiling.REQUEST_ID_HEADER} de la request perfilada")):
+    prof = profiling.load(request_id)
+    if prof is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+    return prof
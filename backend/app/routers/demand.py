@@ -1,102 +1,121 @@
+from __future__ import annotations
+
 from fastapi import APIRouter, HTTPException, Query
 from datetime import date, datetime, timedelta
-import pandas as pd
+from typing import TYPE_CHECKING
+
+from ..deps.admission import Overloaded, query_class
+from ..deps.athena import read_sql
+from ..deps.cache import get_cache
+from ..deps.profiling import phase
+from ..schemas.demand import DemandCurveResponse, HourlyCurve, WeeklyCurve, PercentileCurve
+from ..utils.dates import next_anchor_start
+from ..utils.sql import PREDICCION, PRODUCT_IDS, PRODUCT_MAP, PRODUCT_ORDER, Where, register
 
-from ..deps.athena import get_athena_connection
-from ..schemas.demand import DemandCurveResponse, HourlyCurve
+if TYPE_CHECKING:
+    import numpy as np
 
 router = APIRouter(prefix="/demand", tags=["demand"])
 
-# Mapeo de producto (coincide con telemetría)
-PRODUCT_MAP = {
-    7: "Kerosene",
-    6: "Gasolina 97",
-    4: "Gasolina 93",
-    5: "Gasolina 95",
-    1: "Petróleo Diésel",
-}
-PRODUCT_ORDER = [7, 6, 4, 5, 1]  # orden de salida
-
-def _next_anchor_start(today: date) -> date:
-    """
-    Regla default:
-    - Ancla = próximo día 1 o 15 (>= hoy)
-    - Inicio = primer LUNES >= ancla
-    """
-    # próximo ancla (1 o 15)
-    if today.day <= 1:
-        anchor = date(today.year, today.month, 1)
-    elif today.day <= 15:
-        anchor = date(today.year, today.month, 15)
-    else:
-        # siguiente mes, día 1
-        y = today.year + (1 if today.month == 12 else 0)
-        m = 1 if today.month == 12 else today.month + 1
-        anchor = date(y, m, 1)
-
-    # primer lunes >= anchor (Lun=0..Dom=6)
-    dow = anchor.weekday()
-    delta = (0 - dow) % 7
-    start = anchor + timedelta(days=delta)
-    return start
-
-QUERY = """
+DEMAND_TTL = 6 * 3600   # la predicción se recalcula a lo más diariamente
+
+PRODUCT_INDEX = {pid: i for i, pid in enumerate(PRODUCT_ORDER)}
+
+def _safe_mean(sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Promedio elemento a elemento; 0.0 donde no hay observaciones."""
+    import numpy as np
+    out = np.zeros(sums.shape, dtype=float)
+    np.divide(sums, counts, out=out, where=counts > 0)
+    return out
+
+def _to_list(arr: np.ndarray) -> list[float]:
+    import numpy as np
+    return [float(v) for v in np.round(arr, 6)]
+
+@register("demand.curve")
+def q_demand(client_id: int, start: date | None = None, end: date | None = None, legacy: bool = False) -> tuple[str, dict]:
+    start = start or next_anchor_start(date.today())
+    end = end or start + timedelta(weeks=8)
+    w = (
+        Where(PREDICCION, legacy=legacy)
+        .eq_int("estacion", "client_id", client_id)
+        .in_ints("producto", PRODUCT_IDS)
+        .date_range("fecha", "fecha", start, end)
+    )
+    sql = f"""
 SELECT
   CAST(estacion AS INTEGER)   AS client_id,
   CAST(producto AS INTEGER)   AS product_id,
   CAST(volumen AS DOUBLE)     AS volumen_liters,
   fecha                       AS ts
-FROM modelos_analytics.prediccion_demanda_eds_resultados
-WHERE CAST(estacion AS INTEGER) = %(client_id)s
-  AND CAST(producto AS INTEGER) IN (1,4,5,6,7)
-  AND fecha BETWEEN DATE(%(start)s) AND DATE(%(end)s)
+FROM {PREDICCION.name}
+WHERE {w.sql}
 """
-
-QUERY_MAX = """
+    return sql, w.params
+
+@register("demand.max_date")
+def q_demand_max(client_id: int, legacy: bool = False) -> tuple[str, dict]:
+    w = (
+        Where(PREDICCION, legacy=legacy)
+        .eq_int("estacion", "client_id", client_id)
+        .in_ints("producto", PRODUCT_IDS)
+    )
+    sql = f"""
 SELECT date(max(fecha)) AS max_date
-FROM modelos_analytics.prediccion_demanda_eds_resultados
-WHERE CAST(estacion AS INTEGER) = %(client_id)s
-  AND CAST(producto AS INTEGER) IN (1,4,5,6,7)
+FROM {PREDICCION.name}
+WHERE {w.sql}
 """
+    return sql, w.params
 
-@router.get("/curve", response_model=DemandCurveResponse)
+@router.get("/curve", response_model=DemandCurveResponse, dependencies=[query_class("demand")])
 def demand_curve(
     client_id: int = Query(..., description="Código EDS"),
     start_date: date | None = Query(None, description="YYYY-MM-DD (opcional)"),
-    weeks: int = Query(8, ge=1, le=26, description="Semanas de simulación (default 8)")
+    weeks: int = Query(8, ge=1, le=26, description="Semanas de simulación (default 8)"),
+    weekly: bool = Query(False, description="Incluir perfil día de semana x hora (7x24)"),
+    percentiles: bool = Query(False, description="Incluir bandas P10/P50/P90 por hora"),
 ):
     # Fechas por defecto según regla
     today = date.today()
-    start = start_date or _next_anchor_start(today)
+    start = start_date or next_anchor_start(today)
     end = start + timedelta(weeks=weeks)  # ventana [start, end)
     # end_date de respuesta = domingo anterior a end
     end_resp = end - timedelta(days=1)
 
+    # Curvas ya calculadas (por cualquier worker) se reutilizan tal cual
+    cache = get_cache()
+    return cache.get_or_set(
+        cache.make_key("demand_curve", client_id, start.isoformat(), weeks, weekly, percentiles),
+        lambda: _build_curve(client_id, start, end, end_resp, weeks, weekly, percentiles),
+        ttl=DEMAND_TTL,
+    )
+
+def _build_curve(
+    client_id: int, start: date, end: date, end_resp: date, weeks: int, weekly: bool, percentiles: bool
+) -> DemandCurveResponse:
+    import numpy as np
+    import pandas as pd
     # Ejecutar query
     try:
-        with get_athena_connection() as conn:
-            df_max = pd.read_sql(QUERY_MAX, conn, params={"client_id": int(client_id)})
-            if df_max is None or df_max.empty or pd.isna(df_max.loc[0, "max_date"]):
-                # sin datos para esta estación -> respuesta vacía con metadatos
-                return DemandCurveResponse(
-                    client_id=client_id,
-                    start_date=start,
-                    end_date=end - timedelta(days=1),
-                    weeks=weeks,
-                    data_max_date=start,   # o date.today()
-                    curves=[],
-                    total_hourly_m3=[0.0]*24
-                )
-            data_max_date = pd.to_datetime(df_max.loc[0, "max_date"]).date()
-            
-            df = pd.read_sql(
-                QUERY, conn,
-                params={
-                    "client_id": int(client_id),
-                    "start": start.isoformat(),
-                    "end":   end.isoformat(),
-                }
+        df_max = read_sql(*q_demand_max(client_id), ttl=DEMAND_TTL)
+        if df_max is None or df_max.empty or pd.isna(df_max.loc[0, "max_date"]):
+            # sin datos para esta estación -> respuesta vacía con metadatos
+            return DemandCurveResponse(
+                client_id=client_id,
+                start_date=start,
+                end_date=end - timedelta(days=1),
+                weeks=weeks,
+                data_max_date=start,   # o date.today()
+                curves=[],
+                total_hourly_m3=[0.0]*24,
+                weekly_curves=[] if weekly else None,
+                percentile_curves=[] if percentiles else None,
             )
+        data_max_date = pd.to_datetime(df_max.loc[0, "max_date"]).date()
+
+        df = read_sql(*q_demand(client_id, start, end), ttl=DEMAND_TTL)
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Athena query failed: {e}")
 
@@ -109,34 +128,85 @@ def demand_curve(
             weeks=weeks,
             data_max_date=data_max_date, 
             curves=[],
-            total_hourly_m3=[0.0]*24
+            total_hourly_m3=[0.0]*24,
+            weekly_curves=[] if weekly else None,
+            percentile_curves=[] if percentiles else None,
         )
 
-    # Discretizar (redondeo sin decimales) y pasar a m3
-    df["volumen_rounded_liters"] = df["volumen_liters"].round(0)
-    df["volumen_m3"] = df["volumen_rounded_liters"] / 1000.0
-
-    # Hora del día
-    df["hour"] = pd.to_datetime(df["ts"]).dt.hour
-
-    # Promedio por hora y producto
-    g = df.groupby(["product_id", "hour"], as_index=False)["volumen_m3"].mean()
-
-    # Construir curvas por producto (24 puntos)
-    curves: list[HourlyCurve] = []
-    for pid in PRODUCT_ORDER:
-        pname = PRODUCT_MAP[pid]
-        sub = g[g["product_id"] == pid]
-        arr = [0.0]*24
-        for _, row in sub.iterrows():
-            h = int(row["hour"])
-            arr[h] = float(round(row["volumen_m3"], 6))
-        curves.append(HourlyCurve(product_name=pname, hourly_m3=arr))
-
-    # Curva total (suma por hora)
-    total = [0.0]*24
-    for h in range(24):
-        total[h] = float(round(sum(c.hourly_m3[h] for c in curves), 6))
+    with phase("pandas"):
+        # Discretizar (redondeo sin decimales) y pasar a m3
+        df["volumen_rounded_liters"] = df["volumen_liters"].round(0)
+        df["volumen_m3"] = df["volumen_rounded_liters"] / 1000.0
+
+        # Índices enteros (producto, día de semana, hora, día de ventana) para
+        # reducir todo en una sola pasada sobre arreglos NumPy
+        ts = pd.to_datetime(df["ts"])
+        pidx = df["product_id"].map(PRODUCT_INDEX)
+        valid = pidx.notna() & df["volumen_m3"].notna() & ts.notna()
+        ts = ts[valid]
+        p = pidx[valid].to_numpy(dtype=np.int64)
+        dow = ts.dt.dayofweek.to_numpy(dtype=np.int64)
+        hour = ts.dt.hour.to_numpy(dtype=np.int64)
+        vol = df.loc[valid, "volumen_m3"].to_numpy(dtype=float)
+
+        n_prod = len(PRODUCT_ORDER)
+
+        # Sumas y conteos por (producto, día semana, hora) -> (P, 7, 24)
+        slot = (p * 7 + dow) * 24 + hour
+        sums = np.bincount(slot, weights=vol, minlength=n_prod * 7 * 24).reshape(n_prod, 7, 24)
+        counts = np.bincount(slot, minlength=n_prod * 7 * 24).reshape(n_prod, 7, 24)
+
+        # Promedio por hora y producto (mismo resultado que el groupby original)
+        hourly = _safe_mean(sums.sum(axis=1), counts.sum(axis=1))
+
+    with phase("curves"):
+        # Construir curvas por producto (24 puntos)
+        curves: list[HourlyCurve] = [
+            HourlyCurve(product_name=PRODUCT_MAP[pid], hourly_m3=_to_list(hourly[i]))
+            for i, pid in enumerate(PRODUCT_ORDER)
+        ]
+
+        # Curva total (suma por hora)
+        total = _to_list(np.round(hourly, 6).sum(axis=0))
+
+        weekly_curves = None
+        total_weekly = None
+        if weekly:
+            # Promedio por día de semana y hora (7x24 por producto)
+            wk = _safe_mean(sums, counts)
+            weekly_curves = [
+                WeeklyCurve(product_name=PRODUCT_MAP[pid], weekly_m3=[_to_list(r) for r in wk[i]])
+                for i, pid in enumerate(PRODUCT_ORDER)
+            ]
+            total_weekly = [_to_list(r) for r in np.round(wk, 6).sum(axis=0)]
+
+        percentile_curves = None
+        if percentiles and len(vol):
+            # Grilla (producto, día de ventana, hora) con NaN donde no hay dato;
+            # los percentiles se toman sobre los días de la ventana
+            day = (ts.dt.normalize() - ts.dt.normalize().min()).dt.days.to_numpy(dtype=np.int64)
+            n_days = int(day.max()) + 1
+            cell = (p * n_days + day) * 24 + hour
+            g_sum = np.bincount(cell, weights=vol, minlength=n_prod * n_days * 24)
+            g_cnt = np.bincount(cell, minlength=n_prod * n_days * 24)
+            grid = np.full(g_sum.shape, np.nan)
+            np.divide(g_sum, g_cnt, out=grid, where=g_cnt > 0)
+            grid = grid.reshape(n_prod, n_days, 24)
+
+            has_data = ~np.isnan(grid).all(axis=1)  # (P, 24)
+            filled = np.where(has_data[:, None, :], grid, 0.0)
+            q = np.nanpercentile(filled, [10, 50, 90], axis=1)  # (3, P, 24)
+            percentile_curves = [
+                PercentileCurve(
+                    product_name=PRODUCT_MAP[pid],
+                    p10_m3=_to_list(q[0, i]),
+                    p50_m3=_to_list(q[1, i]),
+                    p90_m3=_to_list(q[2, i]),
+                )
+                for i, pid in enumerate(PRODUCT_ORDER)
+            ]
+        elif percentiles:
+            percentile_curves = []
 
     return DemandCurveResponse(
         client_id=client_id,
@@ -145,5 +215,8 @@ def demand_curve(
         weeks=weeks,
         data_max_date=data_max_date, 
         curves=curves,
-        total_hourly_m3=total
+        total_hourly_m3=total,
+        weekly_curves=weekly_curves,
+        total_weekly_m3=total_weekly,
+        percentile_curves=percentile_curves,
     )
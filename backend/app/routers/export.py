@@ -0,0 +1,178 @@
+from fastapi import APIRouter, HTTPException, Path, Query, Response
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Literal
+
+from ..deps.admission import Overloaded, Priority, query_class, query_slot
+from ..deps.athena import execute_with_reuse, get_athena_arrow_connection
+from ..utils.dates import next_anchor_start
+from ..utils.sql import (
+    PREDICCION, PRODUCT_IDS, TELEMEDICION, Where, merge_params, product_case, register,
+)
+from .demand import DEMAND_TTL
+from .stations import STATIONS_TTL, q_plant_stations
+from .telemetry import TELEMETRY_TTL
+from .plants import plant_stations_cte
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+# Tanques de todas las estaciones de la planta: capacidad (última lectura 24h)
+# + lectura inicial promedio (últimos 3 domingos), como /telemetry/summary
+@register("export.telemetry")
+def q_export_telemetry(plant_id: int, legacy: bool = False) -> tuple[str, dict]:
+    cte, params = plant_stations_cte(plant_id, legacy)
+    today = datetime.now(timezone.utc).date()
+    w_tk = (
+        Where(TELEMEDICION, prefix="tk_", legacy=legacy)
+        .in_ints("protucto", PRODUCT_IDS)
+        .since_hours("telemedicionfecha", "snap", 24)
+        .in_select("ubicacioncodigo", "SELECT client_id FROM st")
+    )
+    w_sun = (
+        Where(TELEMEDICION, prefix="sun_", legacy=legacy)
+        .in_ints("protucto", PRODUCT_IDS)
+        .in_select("ubicacioncodigo", "SELECT client_id FROM st")
+        .epoch_range(
+            "fechaultimalect", "lectura",
+            start=datetime.combine(today - timedelta(days=35), time.min),
+            end=datetime.combine(today, time.max),
+        )
+        .raw("day_of_week(date(from_unixtime(try_cast(fechaultimalect AS bigint)))) = 7")
+    )
+    sql = "WITH" + cte + f""",
+tanks AS (
+  SELECT client_id, tank_id, product_id, capacity_liters
+  FROM (
+    SELECT
+      CAST(ubicacioncodigo AS INTEGER)  AS client_id,
+      CAST(tanque AS INTEGER)           AS tank_id,
+      CAST(protucto AS INTEGER)         AS product_id,
+      CAST(capacidad AS DOUBLE)         AS capacity_liters,
+      row_number() OVER (
+        PARTITION BY ubicacioncodigo, tanque
+        ORDER BY try_cast(telemedicionfecha AS bigint) DESC, fecha_envio DESC
+      ) AS rn
+    FROM {TELEMEDICION.name}
+    WHERE {w_tk.sql}
+  ) t
+  WHERE rn = 1
+),
+sunday_last AS (
+  SELECT client_id, tank_id, volume_liters, lectura_date
+  FROM (
+    SELECT
+      CAST(ubicacioncodigo AS INTEGER)  AS client_id,
+      CAST(tanque AS INTEGER)           AS tank_id,
+      CAST(productovol AS DOUBLE)       AS volume_liters,
+      date(from_unixtime(try_cast(fechaultimalect AS bigint))) AS lectura_date,
+      row_number() OVER (
+        PARTITION BY ubicacioncodigo, tanque, date(from_unixtime(try_cast(fechaultimalect AS bigint)))
+        ORDER BY try_cast(fechaultimalect AS bigint) DESC
+      ) AS rn_day
+    FROM {TELEMEDICION.name}
+    WHERE {w_sun.sql}
+  ) t
+  WHERE rn_day = 1
+),
+init AS (
+  SELECT client_id, tank_id, AVG(volume_liters) AS initial_volume_liters
+  FROM (
+    SELECT
+      client_id, tank_id, volume_liters,
+      row_number() OVER (PARTITION BY client_id, tank_id ORDER BY lectura_date DESC) AS rn_sunday
+    FROM sunday_last
+  ) t
+  WHERE rn_sunday <= 3
+  GROUP BY client_id, tank_id
+)
+SELECT
+  t.client_id,
+  t.tank_id,
+  {product_case("t.product_id")} AS product_name,
+  t.capacity_liters,
+  i.initial_volume_liters
+FROM tanks t
+LEFT JOIN init i
+  ON i.client_id = t.client_id AND i.tank_id = t.tank_id
+ORDER BY t.client_id, t.tank_id
+"""
+    return sql, merge_params(w_tk, w_sun, **params)
+
+# Curva horaria promedio (m3) por estación y producto, como /demand/curve
+@register("export.demand")
+def q_export_demand(plant_id: int, start: date | None = None, end: date | None = None, legacy: bool = False) -> tuple[str, dict]:
+    start = start or next_anchor_start(date.today())
+    end = end or start + timedelta(weeks=8)
+    cte, params = plant_stations_cte(plant_id, legacy)
+    w = (
+        Where(PREDICCION, prefix="dm_", legacy=legacy)
+        .in_select("estacion", "SELECT client_id FROM st")
+        .in_ints("producto", PRODUCT_IDS)
+        .date_range("fecha", "fecha", start, end)
+    )
+    sql = "WITH" + cte + f"""
+SELECT
+  CAST(estacion AS INTEGER) AS client_id,
+  {product_case("CAST(producto AS INTEGER)")} AS product_name,
+  hour(fecha) AS hour,
+  AVG(round(CAST(volumen AS DOUBLE)) / 1000.0) AS hourly_m3
+FROM {PREDICCION.name}
+WHERE {w.sql}
+GROUP BY 1, 2, 3
+ORDER BY 1, 2, 3
+"""
+    return sql, merge_params(w, **params)
+
+# Un export nunca reutiliza un resultado más viejo que el TTL del endpoint equivalente
+MAX_AGE = {"stations": STATIONS_TTL, "telemetry": TELEMETRY_TTL, "demand": DEMAND_TTL}
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def _serialize(table, fmt: str):
+    """Serializa la pyarrow.Table tal cual la entrega el cursor (sin pandas)."""
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink, compression="zstd")
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    # bytes: Response.render de starlette < 0.38 sólo acepta str/bytes
+    return sink.getvalue().to_pybytes()
+
+@router.get("/{dataset}", dependencies=[query_class("export", Priority.BATCH)])
+def export_dataset(
+    dataset: Literal["stations", "telemetry", "demand"] = Path(..., description="stations | telemetry | demand"),
+    plant_id: int = Query(..., description="Plant ID (integer)"),
+    format: Literal["arrow", "parquet"] = Query("arrow", description="arrow (IPC stream) | parquet"),
+    start_date: date | None = Query(None, description="Sólo demand: YYYY-MM-DD (opcional)"),
+    weeks: int = Query(8, ge=1, le=26, description="Sólo demand: semanas (default 8)"),
+):
+    if dataset == "stations":
+        sql, params = q_plant_stations(plant_id)
+    elif dataset == "telemetry":
+        sql, params = q_export_telemetry(plant_id)
+    else:
+        start = start_date or next_anchor_start(date.today())
+        sql, params = q_export_demand(plant_id, start, start + timedelta(weeks=weeks))
+
+    try:
+        with query_slot():
+            cursor = get_athena_arrow_connection().cursor()
+            execute_with_reuse(cursor, sql, params, MAX_AGE[dataset])
+            table = cursor.as_arrow()
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Athena query failed: {e}")
+
+    ext = "arrows" if format == "arrow" else "parquet"
+    return Response(
+        content=_serialize(table, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}_{plant_id}.{ext}"'},
+    )
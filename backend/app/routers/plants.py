@@ -1,29 +1,43 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Path, Query
 from typing import List
-import pandas as pd
+from datetime import date, datetime, timedelta
 
-from ..deps.athena import get_athena_connection
-from ..schemas.plant import Plant
+from ..deps.admission import Overloaded, Priority, query_class
+from ..deps.athena import read_sql
+from ..deps.cache import get_cache
+from ..schemas.plant import Plant, PlantDashboard, StationAutonomy, ProductAutonomy
+from ..utils.sql import (
+    ETLIST, PREDICCION, PRODUCT_IDS, PRODUCT_MAP, PRODUCT_ORDER, TELEMEDICION,
+    Where, merge_params, months_ago, register,
+)
 
 router = APIRouter(prefix="/plants", tags=["plants"])
 
-QUERY = """
+PLANTS_TTL = 24 * 3600      # el maestro de plantas casi no cambia
+DASHBOARD_TTL = 10 * 60     # stock cambia con cada telemedición
+
+@register("plants.list")
+def q_plants(legacy: bool = False) -> tuple[str, dict]:
+    w = (
+        Where(ETLIST, legacy=legacy)
+        .in_strs("auart", ("ZC01", "ZCES"))
+        .raw("regexp_like(werksreal, '^[0-9]+$')")
+        .raw("CAST(werksreal AS INT) <= 1254")
+    )
+    sql = f"""
 SELECT DISTINCT
     CAST(werksreal AS INT) AS plant_id,
     name1werksreal          AS plant_name
-FROM logistica_scr_staging.etlist
-WHERE
-    (auart = 'ZC01' OR auart = 'ZCES')
-    AND regexp_like(werksreal, '^[0-9]+$')
-    AND CAST(werksreal AS INT) <= 1254
+FROM {ETLIST.name}
+WHERE {w.sql}
 ORDER BY plant_id
 """
+    return sql, w.params
 
-@router.get("", response_model=List[Plant])
+@router.get("", response_model=List[Plant], dependencies=[query_class("plants")])
 def list_plants():
     try:
-        with get_athena_connection() as conn:
-            df = pd.read_sql(QUERY, conn)
+        df = read_sql(*q_plants(), ttl=PLANTS_TTL)
 
         if "plant_id" in df.columns:
             try:
@@ -32,5 +46,210 @@ def list_plants():
                 pass
 
         return [Plant(**row.to_dict()) for _, row in df.iterrows()]
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error querying Athena: {e}")
+
+
+def active_since() -> date:
+    """Estación activa = con pedidos en los últimos 3 meses."""
+    return months_ago(date.today(), 3)
+
+# Estaciones activas de la planta (misma regla que /plant-stations)
+def plant_stations_cte(plant_id: int, legacy: bool = False) -> tuple[str, dict]:
+    w = (
+        Where(ETLIST, prefix="st_", legacy=legacy)
+        .in_strs("auart", ("ZC01", "ZCES"))
+        .raw("regexp_like(werksreal, '^[0-9]+$')")
+        .raw("regexp_like(kunag, '^[0-9]+$')")
+        .eq_int("werksreal", "plant_id", plant_id)
+        .date_range("vdatu", "vdatu", start=active_since())
+    )
+    sql = f"""
+st AS (
+  SELECT
+    CAST(kunag AS INTEGER)   AS client_id,
+    max(name1kunag)          AS client_description,
+    max(vtext)               AS zone_name
+  FROM {ETLIST.name}
+  WHERE {w.sql}
+  GROUP BY CAST(kunag AS INTEGER)
+)
+"""
+    return sql, w.params
+
+@register("plants.dashboard_stations")
+def q_dash_stations(plant_id: int, legacy: bool = False) -> tuple[str, dict]:
+    cte, params = plant_stations_cte(plant_id, legacy)
+    return "WITH" + cte + "SELECT client_id, client_description, zone_name FROM st\n", params
+
+# Última lectura por tanque para todas las estaciones de la planta
+@register("plants.dashboard_stock")
+def q_dash_stock(plant_id: int, legacy: bool = False) -> tuple[str, dict]:
+    cte, params = plant_stations_cte(plant_id, legacy)
+    w = (
+        Where(TELEMEDICION, prefix="tk_", legacy=legacy)
+        .in_ints("protucto", PRODUCT_IDS)
+        .since_hours("telemedicionfecha", "snap", 24, quantum_s=DASHBOARD_TTL)
+        .in_select("ubicacioncodigo", "SELECT client_id FROM st")
+    )
+    sql = "WITH" + cte + f""",
+tk AS (
+  SELECT
+    CAST(ubicacioncodigo AS INTEGER)  AS client_id,
+    CAST(tanque AS INTEGER)           AS tank_id,
+    CAST(protucto AS INTEGER)         AS product_id,
+    CAST(capacidad AS DOUBLE)         AS capacity_liters,
+    CAST(productovol AS DOUBLE)       AS volume_liters,
+    from_unixtime(try_cast(fechaultimalect AS bigint)) AS reading_ts,
+    row_number() OVER (
+      PARTITION BY ubicacioncodigo, tanque
+      ORDER BY try_cast(fechaultimalect AS bigint) DESC, fecha_envio DESC
+    ) AS rn
+  FROM {TELEMEDICION.name}
+  WHERE {w.sql}
+)
+SELECT client_id, tank_id, product_id, capacity_liters, volume_liters, reading_ts
+FROM tk
+WHERE rn = 1
+"""
+    return sql, merge_params(w, **params)
+
+# Demanda horaria promedio (litros/h) por estación y producto en el horizonte
+@register("plants.dashboard_demand")
+def q_dash_demand(plant_id: int, start: date | None = None, end: date | None = None, legacy: bool = False) -> tuple[str, dict]:
+    start = start or date.today()
+    end = end or start + timedelta(days=7)
+    cte, params = plant_stations_cte(plant_id, legacy)
+    w = (
+        Where(PREDICCION, prefix="dm_", legacy=legacy)
+        .in_select("estacion", "SELECT client_id FROM st")
+        .in_ints("producto", PRODUCT_IDS)
+        .date_range("fecha", "fecha", start, end)
+    )
+    sql = "WITH" + cte + f"""
+SELECT
+  CAST(estacion AS INTEGER)      AS client_id,
+  CAST(producto AS INTEGER)      AS product_id,
+  AVG(CAST(volumen AS DOUBLE))   AS hourly_liters
+FROM {PREDICCION.name}
+WHERE {w.sql}
+GROUP BY 1, 2
+"""
+    return sql, merge_params(w, **params)
+
+def _opt(v) -> float | None:
+    import numpy as np
+    import pandas as pd
+    return None if v is None or pd.isna(v) or np.isinf(v) else float(v)
+
+@router.get("/{plant_id}/dashboard", response_model=PlantDashboard, dependencies=[query_class("plants", Priority.BATCH)])
+def plant_dashboard(
+    plant_id: int = Path(..., description="Plant ID (integer)"),
+    horizon_days: int = Query(7, ge=1, le=28, description="Días de demanda proyectada a promediar"),
+):
+    cache = get_cache()
+    return cache.get_or_set(
+        cache.make_key("plant_dashboard", plant_id, horizon_days, date.today().isoformat()),
+        lambda: _build_dashboard(plant_id, horizon_days),
+        ttl=DASHBOARD_TTL,
+    )
+
+def _build_dashboard(plant_id: int, horizon_days: int) -> PlantDashboard:
+    import numpy as np
+    import pandas as pd
+    today = date.today()
+    try:
+        df_st = read_sql(*q_dash_stations(plant_id), ttl=DASHBOARD_TTL)
+        df_stock = read_sql(*q_dash_stock(plant_id), ttl=DASHBOARD_TTL)
+        df_dem = read_sql(*q_dash_demand(plant_id, today, today + timedelta(days=horizon_days)), ttl=DASHBOARD_TTL)
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Athena query failed: {e}")
+
+    generated_at = datetime.utcnow()
+    if df_st is None or df_st.empty:
+        return PlantDashboard(plant_id=plant_id, generated_at=generated_at, horizon_days=horizon_days, stations=[])
+
+    # Stock y capacidad por estación/producto (agregado de tanques)
+    if df_stock is None or df_stock.empty:
+        df_stock = pd.DataFrame(columns=["client_id", "tank_id", "product_id", "capacity_liters", "volume_liters", "reading_ts"])
+    df_stock["reading_ts"] = pd.to_datetime(df_stock["reading_ts"])
+    agg = df_stock.groupby(["client_id", "product_id"], as_index=False).agg(
+        tanks_count=("tank_id", "nunique"),
+        capacity_liters=("capacity_liters", "sum"),
+        stock_liters=("volume_liters", "sum"),
+        stock_readings=("volume_liters", "count"),
+        last_reading=("reading_ts", "max"),
+    )
+    if df_dem is None or df_dem.empty:
+        df_dem = pd.DataFrame(columns=["client_id", "product_id", "hourly_liters"])
+    df = agg.merge(df_dem, on=["client_id", "product_id"], how="left")
+
+    # Autonomía vectorizada: horas = stock / demanda horaria
+    stock = df["stock_liters"].to_numpy(dtype=float)
+    cap = df["capacity_liters"].to_numpy(dtype=float)
+    rate = df["hourly_liters"].to_numpy(dtype=float)
+    has_stock = df["stock_readings"].to_numpy() > 0
+    stock = np.where(has_stock, stock, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hours = np.where(has_stock & (rate > 0), stock / rate, np.nan)
+        pct = np.where(has_stock & (cap > 0), stock / cap * 100.0, np.nan)
+    df["stock_liters"] = stock
+    df["autonomy_hours"] = hours
+    df["autonomy_days"] = hours / 24.0
+    df["stock_pct"] = pct
+    df["product_name"] = df["product_id"].map(PRODUCT_MAP).fillna(df["product_id"].astype(str))
+    df["product_rank"] = df["product_id"].map({pid: i for i, pid in enumerate(PRODUCT_ORDER)})
+
+    # Producto crítico (menor autonomía) por estación
+    crit = (
+        df.dropna(subset=["autonomy_hours"])
+        .sort_values("autonomy_hours", kind="mergesort")
+        .drop_duplicates("client_id")
+        .set_index("client_id")[["autonomy_hours", "product_name"]]
+    )
+
+    st_df = df_st.drop_duplicates("client_id").set_index("client_id")
+    st_df = st_df.join(crit, how="left").sort_values(
+        ["autonomy_hours"], na_position="last", kind="mergesort"
+    )
+
+    by_station = {
+        cid: g.sort_values("product_rank")
+        for cid, g in df.groupby("client_id", sort=False)
+    }
+
+    stations: list[StationAutonomy] = []
+    for cid, row in st_df.iterrows():
+        g = by_station.get(cid)
+        products = [] if g is None else [
+            ProductAutonomy(
+                product_name=str(p["product_name"]),
+                tanks_count=int(p["tanks_count"]),
+                capacity_liters=float(p["capacity_liters"]),
+                stock_liters=_opt(p["stock_liters"]),
+                stock_pct=_opt(p["stock_pct"]),
+                hourly_demand_liters=_opt(p["hourly_liters"]),
+                autonomy_hours=_opt(p["autonomy_hours"]),
+                autonomy_days=_opt(p["autonomy_days"]),
+                last_reading=(None if pd.isna(p["last_reading"]) else p["last_reading"].to_pydatetime()),
+            )
+            for _, p in g.iterrows()
+        ]
+        min_h = _opt(row["autonomy_hours"])
+        stations.append(
+            StationAutonomy(
+                client_id=int(cid),
+                client_description=(None if pd.isna(row["client_description"]) else str(row["client_description"])),
+                zone_name=(None if pd.isna(row["zone_name"]) else str(row["zone_name"])),
+                min_autonomy_hours=min_h,
+                min_autonomy_days=(None if min_h is None else min_h / 24.0),
+                critical_product=(None if pd.isna(row["product_name"]) else str(row["product_name"])),
+                products=products,
+            )
+        )
+
+    return PlantDashboard(plant_id=plant_id, generated_at=generated_at, horizon_days=horizon_days, stations=stations)
@@ -1,13 +1,37 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
-import pandas as pd
+from fastapi import APIRouter, HTTPException, Query, Response
+from typing import List, Union
+import hashlib
+import json
 
-from ..deps.athena import get_athena_connection
-from ..schemas.station import Station
+from ..config import settings
+from ..deps.admission import Overloaded, query_class
+from ..deps.athena import read_sql
+from ..deps.cache import get_cache
+from ..deps.warmup import track_plant_usage
+from ..schemas.station import Station, StationSearchResult, StationDelta
+from ..utils.search_index import RefreshingIndex
+from ..utils.sql import ETLIST, JEFES_ZONA, VENTA_MENSUAL, Where, register
+from .plants import active_since
 
 router = APIRouter(tags=["stations"])
 
-QUERY = """
+STATIONS_TTL = 3600
+SNAPSHOT_TTL = 7 * 24 * 3600   # cuánto tiempo se acepta un token 'since'
+VERSION_HEADER = "X-Stations-Version"
+
+def _active_stations_where(legacy: bool) -> Where:
+    return (
+        Where(ETLIST, alias="e", legacy=legacy)
+        .in_strs("auart", ("ZC01", "ZCES"))
+        .raw("regexp_like(e.werksreal, '^[0-9]+$')")
+        .raw("regexp_like(e.kunag, '^[0-9]+$')")
+        .date_range("vdatu", "vdatu", start=active_since())
+    )
+
+@register("stations.plant")
+def q_plant_stations(plant_id: int, legacy: bool = False) -> tuple[str, dict]:
+    w = _active_stations_where(legacy).eq_int("werksreal", "plant_id", plant_id)
+    sql = f"""
 SELECT DISTINCT
     CAST(e.werksreal AS INTEGER) AS plant_id,
     e.name1werksreal             AS plant_name,
@@ -17,27 +41,70 @@ SELECT DISTINCT
     e.vtext                      AS zone_name,
     mjz.znombre_1_key            AS zone_manager_name,
     vm.cod_camion_tipo           AS truck_type
-FROM logistica_scr_staging.etlist e
-LEFT JOIN venta_concesionario_staging.venta_mensual vm
+FROM {ETLIST.name} e
+LEFT JOIN {VENTA_MENSUAL.name} vm
     ON TRY_CAST(vm.razon_social AS INTEGER) = CAST(e.kunag AS INTEGER)
-LEFT JOIN maestros_staging.maestro_jefes_zona mjz
+LEFT JOIN {JEFES_ZONA.name} mjz
     ON TRY_CAST(vm.cod_zona_jefe AS INTEGER) = TRY_CAST(mjz.sales_grp_key AS INTEGER)
-WHERE
-    e.auart IN ('ZC01', 'ZCES')
-    AND regexp_like(e.werksreal, '^[0-9]+$')
-    AND regexp_like(e.kunag, '^[0-9]+$')
-    AND CAST(e.werksreal AS INTEGER) = %(plant_id)s
-    AND try_cast(e.vdatu AS DATE) >= date_add('month', -3, current_date)
+WHERE {w.sql}
 ORDER BY plant_id, client_id
 """
+    return sql, w.params
 
-@router.get("/plant-stations", response_model=List[Station])
-def list_plant_stations(plant_id: int = Query(..., description="Plant ID (integer)")):
-    try:
-        with get_athena_connection() as conn:
-            df = pd.read_sql(QUERY, conn, params={"plant_id": plant_id})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Athena query failed: {e}")
+# Todas las estaciones activas de la red (base del índice de búsqueda)
+@register("stations.all")
+def q_all_stations(legacy: bool = False) -> tuple[str, dict]:
+    w = _active_stations_where(legacy)
+    sql = f"""
+SELECT
+    CAST(e.werksreal AS INTEGER) AS plant_id,
+    max(e.name1werksreal)        AS plant_name,
+    CAST(e.kunag AS INTEGER)     AS client_id,
+    max(e.name1kunag)            AS client_description,
+    max(e.zone1)                 AS zone_id,
+    max(e.vtext)                 AS zone_name
+FROM {ETLIST.name} e
+WHERE {w.sql}
+GROUP BY CAST(e.werksreal AS INTEGER), CAST(e.kunag AS INTEGER)
+"""
+    return sql, w.params
+
+def _load_all_stations() -> list[dict]:
+    df = read_sql(*q_all_stations(), ttl=STATIONS_TTL)
+    if df is None or df.empty:
+        return []
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict("records")
+
+station_index = RefreshingIndex(_load_all_stations, max_age=settings.station_index_max_age)
+
+@router.get("/stations/search", response_model=List[StationSearchResult])
+def search_stations(
+    q: str = Query(..., min_length=1, description="Código, razón social o zona"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    # Sólo lee el índice ya construido (lo mantiene el scheduler en segundo plano)
+    index = station_index.get()
+    if index is None:
+        raise HTTPException(
+            status_code=503, detail="Station index is still being built, retry later", headers={"Retry-After": "10"}
+        )
+
+    return [
+        StationSearchResult(
+            plant_id=int(rec["plant_id"]),
+            plant_name=(None if rec.get("plant_name") is None else str(rec["plant_name"])),
+            client_id=int(rec["client_id"]),
+            client_description=(None if rec.get("client_description") is None else str(rec["client_description"])),
+            zone_id=(None if rec.get("zone_id") is None else str(rec["zone_id"])),
+            zone_name=(None if rec.get("zone_name") is None else str(rec["zone_name"])),
+            score=score,
+        )
+        for rec, score in index.search(q, limit=limit)
+    ]
+
+def _query_plant_stations(plant_id: int) -> list[Station]:
+    df = read_sql(*q_plant_stations(plant_id), ttl=STATIONS_TTL)
 
     if df is None or df.empty:
         return []
@@ -58,3 +125,91 @@ def list_plant_stations(plant_id: int = Query(..., description="Plant ID (intege
                 pass
 
     return [Station(**row.to_dict()) for _, row in df.iterrows()]
+
+def _fingerprints(stations: list[Station]) -> tuple[str, dict[int, str]]:
+    """
+    Huella por estación (todas sus filas) y versión del conjunto completo.
+    Una estación puede venir en varias filas (p. ej. varios tipos de camión).
+    """
+    rows: dict[int, list[dict]] = {}
+    for s in stations:
+        rows.setdefault(s.client_id, []).append(s.model_dump())
+    fps = {
+        cid: hashlib.sha1(json.dumps(sorted(r, key=lambda d: json.dumps(d, sort_keys=True)), sort_keys=True).encode()).hexdigest()
+        for cid, r in rows.items()
+    }
+    version = hashlib.sha256(json.dumps(sorted(fps.items())).encode()).hexdigest()[:20]
+    return version, fps
+
+def _diff(prev: dict[int, str], fps: dict[int, str]) -> tuple[set[int], set[int], list[int]]:
+    """Estaciones nuevas, modificadas y eliminadas entre dos juegos de huellas."""
+    added = fps.keys() - prev.keys()
+    changed = {cid for cid in fps.keys() & prev.keys() if fps[cid] != prev[cid]}
+    return added, changed, sorted(prev.keys() - fps.keys())
+
+def _version_key(plant_id: int) -> str:
+    return get_cache().make_key("plant_stations_version", plant_id)
+
+def _plant_stations_view(plant_id: int) -> dict:
+    """
+    Estaciones de la planta junto a su versión y huellas, cacheadas con el mismo
+    TTL que el DataFrame: las huellas se calculan una vez por versión, no en
+    cada request. La versión vigente también queda sola bajo su propia clave,
+    para responder un 'since' sin cambios sin leer la lista completa.
+    """
+    cache = get_cache()
+
+    def _build() -> dict:
+        stations = _query_plant_stations(plant_id)
+        version, fps = _fingerprints(stations)
+        # Se guardan sólo las huellas de cada versión: bastan para calcular el delta
+        cache.set(cache.make_key("stations_snapshot", plant_id, version), fps, ttl=SNAPSHOT_TTL)
+        cache.set(_version_key(plant_id), version, ttl=STATIONS_TTL)
+        return {"version": version, "fingerprints": fps, "stations": stations}
+
+    return cache.get_or_set(cache.make_key("plant_stations_view", plant_id), _build, ttl=STATIONS_TTL)
+
+def _load_plant_stations(plant_id: int) -> list[Station]:
+    return _plant_stations_view(plant_id)["stations"]
+
+@router.get("/plant-stations", response_model=Union[List[Station], StationDelta], dependencies=[query_class("stations")])
+def list_plant_stations(
+    response: Response,
+    plant_id: int = Query(..., description="Plant ID (integer)"),
+    since: str | None = Query(None, description=f"Versión previa ({VERSION_HEADER}); responde sólo cambios"),
+):
+    track_plant_usage(plant_id)
+    cache = get_cache()
+    # Sin cambios desde 'since': ni la lista ni las huellas hacen falta
+    if since is not None and cache.get(_version_key(plant_id)) == since:
+        response.headers[VERSION_HEADER] = since
+        return StationDelta(plant_id=plant_id, version=since)
+
+    try:
+        view = _plant_stations_view(plant_id)
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Athena query failed: {e}")
+
+    stations, version, fps = view["stations"], view["version"], view["fingerprints"]
+    response.headers[VERSION_HEADER] = version
+
+    if since is None:
+        return stations
+
+    if since == version:
+        return StationDelta(plant_id=plant_id, version=version)
+
+    prev = cache.get(cache.make_key("stations_snapshot", plant_id, since))
+    if not isinstance(prev, dict):
+        return StationDelta(plant_id=plant_id, version=version, full=True, added=stations)
+
+    added_ids, changed_ids, removed = _diff(prev, fps)
+    return StationDelta(
+        plant_id=plant_id,
+        version=version,
+        added=[s for s in stations if s.client_id in added_ids],
+        changed=[s for s in stations if s.client_id in changed_ids],
+        removed=removed,
+    )
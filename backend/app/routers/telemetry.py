@@ -1,13 +1,32 @@
 from fastapi import APIRouter, HTTPException, Query
-import pandas as pd
+from datetime import datetime, time, timedelta, timezone
 import traceback
 import logging
-from ..deps.athena import get_athena_connection
-from ..schemas.telemetry import TelemetrySummary, ProductSummary, TankSummary
+from ..deps.admission import Overloaded, query_class
+from ..deps.athena import read_sql
+from ..deps.profiling import phase
+from ..schemas.telemetry import (
+    TelemetrySummary, ProductSummary, TankSummary,
+    TelemetryHistory, TankHistory, TankHistoryPoint,
+)
+from ..utils.downsampling import lttb_indices, bucket_seconds_for
+from ..utils.sql import PRODUCT_IDS, TELEMEDICION, Where, merge_params, product_case, register
 
 router = APIRouter(prefix="/telemetry", tags=["telemetry"])
 
-Q1_TANKS = """
+TELEMETRY_TTL = 10 * 60
+
+def _telemetry_where(client_id: int, legacy: bool) -> Where:
+    return (
+        Where(TELEMEDICION, legacy=legacy)
+        .eq_int("ubicacioncodigo", "client_id", client_id)
+        .in_ints("protucto", PRODUCT_IDS)  # 1=Diésel, 4=93, 5=95, 6=97, 7=Kerosene
+    )
+
+@register("telemetry.tanks")
+def q_tanks(client_id: int, legacy: bool = False) -> tuple[str, dict]:
+    w = _telemetry_where(client_id, legacy).since_hours("telemedicionfecha", "snap", 24, quantum_s=TELEMETRY_TTL)
+    sql = f"""
 WITH base AS (
   SELECT
     CAST(ubicacioncodigo AS INTEGER)                 AS client_id,
@@ -19,28 +38,28 @@ WITH base AS (
       PARTITION BY ubicacioncodigo, tanque
       ORDER BY try_cast(telemedicionfecha AS bigint) DESC, fecha_envio DESC
     ) AS rn
-  FROM copecfuel_staging.telemedicion_detalle
-  WHERE CAST(ubicacioncodigo AS INTEGER) = %(client_id)s
-    AND protucto IN (1,4,5,6,7)  -- 1=Diésel, 4=93, 5=95, 6=97, 7=Kerosene
-    AND from_unixtime(try_cast(telemedicionfecha AS bigint)) >= date_add('hour', -24, current_timestamp)
+  FROM {TELEMEDICION.name}
+  WHERE {w.sql}
 )
 SELECT
   client_id,
   tank_id,
-  CASE product_id
-    WHEN 7 THEN 'Kerosene'
-    WHEN 6 THEN 'Gasolina 97'
-    WHEN 4 THEN 'Gasolina 93'
-    WHEN 5 THEN 'Gasolina 95'
-    WHEN 1 THEN 'Petróleo Diésel'
-    ELSE CAST(product_id AS VARCHAR)
-  END AS product_name,
+  {product_case("product_id")} AS product_name,
   capacity_liters
 FROM base
-WHERE rn = 1;
+WHERE rn = 1
 """
+    return sql, w.params
 
-Q2_INIT = """
+@register("telemetry.initial")
+def q_initial(client_id: int, legacy: bool = False) -> tuple[str, dict]:
+    today = datetime.now(timezone.utc).date()
+    w = _telemetry_where(client_id, legacy).epoch_range(
+        "fechaultimalect", "lectura",
+        start=datetime.combine(today - timedelta(days=35), time.min),
+        end=datetime.combine(today, time.max),
+    )
+    sql = f"""
 WITH base AS (
   SELECT
     CAST(ubicacioncodigo AS INTEGER)       AS client_id,
@@ -49,10 +68,8 @@ WITH base AS (
     CAST(productovol AS DOUBLE)            AS volume_liters,
     date(from_unixtime(try_cast(fechaultimalect AS bigint))) AS lectura_date,
     from_unixtime(try_cast(fechaultimalect AS bigint))       AS lectura_ts
-  FROM copecfuel_staging.telemedicion_detalle
-  WHERE CAST(ubicacioncodigo AS INTEGER) = %(client_id)s
-    AND protucto IN (1,4,5,6,7)
-    AND date(from_unixtime(try_cast(fechaultimalect AS bigint))) BETWEEN date_add('day', -35, current_date) AND current_date
+  FROM {TELEMEDICION.name}
+  WHERE {w.sql}
 ),
 -- última lectura de cada domingo por tanque
 sunday_last AS (
@@ -87,14 +104,7 @@ with_alias AS (
   SELECT
     client_id,
     tank_id,
-    CASE product_id
-      WHEN 7 THEN 'Kerosene'
-      WHEN 6 THEN 'Gasolina 97'
-      WHEN 4 THEN 'Gasolina 93'
-      WHEN 5 THEN 'Gasolina 95'
-      WHEN 1 THEN 'Petróleo Diésel'
-      ELSE CAST(product_id AS VARCHAR)
-    END AS product_name,
+    {product_case("product_id")} AS product_name,
     product_id,
     volume_liters
   FROM last3
@@ -107,51 +117,145 @@ SELECT
 FROM with_alias
 GROUP BY client_id, tank_id, product_name
 """
+    return sql, w.params
 
-@router.get("/summary", response_model=TelemetrySummary)
+# Serie de volumen por tanque agregada en buckets de tiempo (epoch // bucket)
+@register("telemetry.history")
+def q_history(
+    client_id: int, start_epoch: int | None = None, end_epoch: int | None = None, bucket: int = 3600, legacy: bool = False
+) -> tuple[str, dict]:
+    end_epoch = end_epoch or (int(datetime.now(timezone.utc).timestamp()) // bucket) * bucket
+    start_epoch = start_epoch or end_epoch - 14 * 86400
+    w = _telemetry_where(client_id, legacy).epoch_range("fechaultimalect", "lectura", start_epoch, end_epoch)
+    sql = f"""
+WITH base AS (
+  SELECT
+    CAST(tanque AS INTEGER)                   AS tank_id,
+    CAST(protucto AS INTEGER)                 AS product_id,
+    CAST(productovol AS DOUBLE)               AS volume_liters,
+    try_cast(fechaultimalect AS bigint)       AS lectura_epoch
+  FROM {TELEMEDICION.name}
+  WHERE {w.sql}
+)
+SELECT
+  tank_id,
+  {product_case("product_id")} AS product_name,
+  (lectura_epoch / %(bucket)s) * %(bucket)s AS bucket_epoch,
+  AVG(volume_liters) AS volume_liters
+FROM base
+WHERE volume_liters IS NOT NULL
+GROUP BY 1, 2, 3
+ORDER BY tank_id, bucket_epoch
+"""
+    return sql, merge_params(w, bucket=bucket)
+
+@router.get("/summary", response_model=TelemetrySummary, dependencies=[query_class("telemetry")])
 def telemetry_summary(client_id: int = Query(..., description="Código EDS")):
+    import pandas as pd
     try:
-        with get_athena_connection() as conn:
-            df_tanks = pd.read_sql(Q1_TANKS, conn, params={"client_id": client_id})
-            df_init  = pd.read_sql(Q2_INIT,  conn, params={"client_id": client_id})
+        df_tanks = read_sql(*q_tanks(client_id), ttl=TELEMETRY_TTL)
+        df_init  = read_sql(*q_initial(client_id), ttl=TELEMETRY_TTL)
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Athena query failed: {e}")
 
     if df_tanks is None or df_tanks.empty:
         return TelemetrySummary(client_id=client_id, products=[])
 
-    df = pd.merge(
-        df_tanks, df_init,
-        on=["client_id", "tank_id", "product_name"],
-        how="left"
-    )
-    df["capacity_m3"] = df["capacity_liters"] / 1000.0
-    if "initial_volume_liters" not in df.columns:
-        df["initial_volume_liters"] = pd.NA
-    df["initial_volume_m3"] = df["initial_volume_liters"] / 1000.0
-
-    products: list[ProductSummary] = []
-    for pname, g in df.groupby("product_name", dropna=False):
-        tanks = [
-            TankSummary(
-                tank_id=int(row["tank_id"]),
-                capacity_liters=float(row["capacity_liters"]),
-                capacity_m3=float(row["capacity_m3"]),
-                initial_volume_liters=(None if pd.isna(row["initial_volume_liters"]) else float(row["initial_volume_liters"])),
-                initial_volume_m3=(None if pd.isna(row["initial_volume_m3"]) else float(row["initial_volume_m3"])),
-            )
-            for _, row in g.sort_values("tank_id").iterrows()
-        ]
-        products.append(
-            ProductSummary(
-                product_name=(None if pd.isna(pname) else str(pname)),
-                tanks_count=int(g["tank_id"].nunique()),
-                capacity_liters=float(g["capacity_liters"].sum()),
-                capacity_m3=float(g["capacity_liters"].sum() / 1000.0),
-                initial_product_liters=(None if not g["initial_volume_liters"].notna().any() else float(g["initial_volume_liters"].sum(skipna=True))),
-                initial_product_m3=(None if not g["initial_volume_liters"].notna().any() else float(g["initial_volume_liters"].sum(skipna=True) / 1000.0)),
-                tanks=tanks
-            )
+    with phase("pandas"):
+        df = pd.merge(
+            df_tanks, df_init,
+            on=["client_id", "tank_id", "product_name"],
+            how="left"
         )
+        df["capacity_m3"] = df["capacity_liters"] / 1000.0
+        if "initial_volume_liters" not in df.columns:
+            df["initial_volume_liters"] = pd.NA
+        df["initial_volume_m3"] = df["initial_volume_liters"] / 1000.0
+
+    with phase("pydantic"):
+        products: list[ProductSummary] = []
+        for pname, g in df.groupby("product_name", dropna=False):
+            tanks = [
+                TankSummary(
+                    tank_id=int(row["tank_id"]),
+                    capacity_liters=float(row["capacity_liters"]),
+                    capacity_m3=float(row["capacity_m3"]),
+                    initial_volume_liters=(None if pd.isna(row["initial_volume_liters"]) else float(row["initial_volume_liters"])),
+                    initial_volume_m3=(None if pd.isna(row["initial_volume_m3"]) else float(row["initial_volume_m3"])),
+                )
+                for _, row in g.sort_values("tank_id").iterrows()
+            ]
+            products.append(
+                ProductSummary(
+                    product_name=(None if pd.isna(pname) else str(pname)),
+                    tanks_count=int(g["tank_id"].nunique()),
+                    capacity_liters=float(g["capacity_liters"].sum()),
+                    capacity_m3=float(g["capacity_liters"].sum() / 1000.0),
+                    initial_product_liters=(None if not g["initial_volume_liters"].notna().any() else float(g["initial_volume_liters"].sum(skipna=True))),
+                    initial_product_m3=(None if not g["initial_volume_liters"].notna().any() else float(g["initial_volume_liters"].sum(skipna=True) / 1000.0)),
+                    tanks=tanks
+                )
+            )
 
     return TelemetrySummary(client_id=client_id, products=products)
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    """Normaliza a UTC sin tz (from_unixtime de Athena entrega UTC naive)."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+@router.get("/history", response_model=TelemetryHistory, dependencies=[query_class("telemetry")])
+def telemetry_history(
+    client_id: int = Query(..., description="Código EDS"),
+    start: datetime | None = Query(None, description="Inicio (ISO 8601, UTC). Default: end - 14 días"),
+    end: datetime | None = Query(None, description="Fin (ISO 8601, UTC). Default: ahora"),
+    points: int = Query(300, ge=10, le=2000, description="Puntos objetivo por tanque"),
+):
+    import pandas as pd
+    end = _naive_utc(end or datetime.now(timezone.utc))
+    start = _naive_utc(start or end - timedelta(days=14))
+    if start >= end:
+        raise HTTPException(status_code=422, detail="start debe ser anterior a end")
+
+    start_epoch = int((start - datetime(1970, 1, 1)).total_seconds())
+    end_epoch = int((end - datetime(1970, 1, 1)).total_seconds())
+    bucket = bucket_seconds_for(end_epoch - start_epoch, points)
+    # Bordes alineados al bucket: la misma ventana reutiliza el resultado cacheado
+    start_epoch = (start_epoch // bucket) * bucket
+    end_epoch = (end_epoch // bucket) * bucket
+
+    try:
+        df = read_sql(*q_history(client_id, start_epoch, end_epoch, bucket), ttl=TELEMETRY_TTL)
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Athena query failed: {e}")
+
+    if df is None or df.empty:
+        return TelemetryHistory(client_id=client_id, start=start, end=end, bucket_seconds=bucket, tanks=[])
+
+    with phase("lttb"):
+        tanks: list[TankHistory] = []
+        for (tank_id, pname), g in df.groupby(["tank_id", "product_name"], dropna=False, sort=True):
+            g = g.sort_values("bucket_epoch")
+            x = g["bucket_epoch"].to_numpy(dtype=float)
+            y = g["volume_liters"].to_numpy(dtype=float)
+            keep = lttb_indices(x, y, points)
+            ts = pd.to_datetime(x[keep], unit="s")
+            tanks.append(
+                TankHistory(
+                    tank_id=int(tank_id),
+                    product_name=(None if pd.isna(pname) else str(pname)),
+                    raw_points=int(len(g)),
+                    points=[
+                        TankHistoryPoint(ts=t.to_pydatetime(), volume_liters=float(v), volume_m3=float(v / 1000.0))
+                        for t, v in zip(ts, y[keep])
+                    ],
+                )
+            )
+
+    return TelemetryHistory(client_id=client_id, start=start, end=end, bucket_seconds=bucket, tanks=tanks)
@@ -1,11 +1,22 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import date
 
 class HourlyCurve(BaseModel):
     product_name: str
     hourly_m3: List[float]
 
+class WeeklyCurve(BaseModel):
+    product_name: str
+    # 7 filas (Lun=0 … Dom=6) x 24 horas
+    weekly_m3: List[List[float]]
+
+class PercentileCurve(BaseModel):
+    product_name: str
+    p10_m3: List[float]
+    p50_m3: List[float]
+    p90_m3: List[float]
+
 class DemandCurveResponse(BaseModel):
     client_id: int
     start_date: date
@@ -14,3 +25,7 @@ class DemandCurveResponse(BaseModel):
     data_max_date: date
     curves: List[HourlyCurve]
     total_hourly_m3: List[float]
+    # Perfiles opcionales (sólo si se piden con weekly=true / percentiles=true)
+    weekly_curves: Optional[List[WeeklyCurve]] = None
+    total_weekly_m3: Optional[List[List[float]]] = None
+    percentile_curves: Optional[List[PercentileCurve]] = None
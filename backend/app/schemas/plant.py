@@ -1,5 +1,34 @@
 from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
 
 class Plant(BaseModel):
     plant_id: int
     plant_name: str | None = None
+
+class ProductAutonomy(BaseModel):
+    product_name: str
+    tanks_count: int
+    capacity_liters: float
+    stock_liters: Optional[float] = None
+    stock_pct: Optional[float] = None
+    hourly_demand_liters: Optional[float] = None
+    autonomy_hours: Optional[float] = None
+    autonomy_days: Optional[float] = None
+    last_reading: Optional[datetime] = None
+
+class StationAutonomy(BaseModel):
+    client_id: int
+    client_description: Optional[str] = None
+    zone_name: Optional[str] = None
+    min_autonomy_hours: Optional[float] = None
+    min_autonomy_days: Optional[float] = None
+    critical_product: Optional[str] = None
+    products: List[ProductAutonomy]
+
+class PlantDashboard(BaseModel):
+    plant_id: int
+    generated_at: datetime
+    horizon_days: int
+    # Ordenadas por urgencia (menor autonomía primero; sin datos al final)
+    stations: List[StationAutonomy]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class Station(BaseModel):
     plant_id: int
@@ -10,3 +10,16 @@ class Station(BaseModel):
     zone_name: Optional[str] = None
     zone_manager_name: Optional[str] = None
     truck_type: Optional[str] = None
+
+class StationSearchResult(Station):
+    score: float
+
+class StationDelta(BaseModel):
+    plant_id: int
+    version: str
+    # full=True: el token 'since' no se reconoce -> 'added' trae la lista completa
+    full: bool = False
+    # Filas completas de cada estación nueva/modificada (reemplazan a las anteriores)
+    added: List[Station] = []
+    changed: List[Station] = []
+    removed: List[int] = []
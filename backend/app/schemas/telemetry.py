@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional
+from datetime import datetime
 
 class TankSummary(BaseModel):
     tank_id: int
@@ -20,3 +21,21 @@ class ProductSummary(BaseModel):
 class TelemetrySummary(BaseModel):
     client_id: int
     products: List[ProductSummary]
+
+class TankHistoryPoint(BaseModel):
+    ts: datetime
+    volume_liters: float
+    volume_m3: float
+
+class TankHistory(BaseModel):
+    tank_id: int
+    product_name: Optional[str] = None
+    raw_points: int
+    points: List[TankHistoryPoint]
+
+class TelemetryHistory(BaseModel):
+    client_id: int
+    start: datetime
+    end: datetime
+    bucket_seconds: int
+    tanks: List[TankHistory]
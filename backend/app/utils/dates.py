@@ -0,0 +1,26 @@
+# backend/app/utils/dates.py
+from __future__ import annotations
+from datetime import date, timedelta
+
+def next_anchor_start(today: date) -> date:
+    """
+    Regla default:
+    - Ancla = próximo día 1 o 15 (>= hoy)
+    - Inicio = primer LUNES >= ancla
+    """
+    # próximo ancla (1 o 15)
+    if today.day <= 1:
+        anchor = date(today.year, today.month, 1)
+    elif today.day <= 15:
+        anchor = date(today.year, today.month, 15)
+    else:
+        # siguiente mes, día 1
+        y = today.year + (1 if today.month == 12 else 0)
+        m = 1 if today.month == 12 else today.month + 1
+        anchor = date(y, m, 1)
+
+    # primer lunes >= anchor (Lun=0..Dom=6)
+    dow = anchor.weekday()
+    delta = (0 - dow) % 7
+    start = anchor + timedelta(days=delta)
+    return start
@@ -0,0 +1,56 @@
+# backend/app/utils/downsampling.py
+from __future__ import annotations
+import math
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Índices de los puntos elegidos por Largest-Triangle-Three-Buckets.
+    Conserva primer y último punto y, por cada bucket intermedio, el punto que
+    forma el triángulo de mayor área con el elegido anterior y el promedio del
+    bucket siguiente. Si no hace falta reducir, retorna todos los índices.
+    """
+    import numpy as np
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    out = np.empty(threshold, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(np.floor(i * every)) + 1
+        end = int(np.floor((i + 1) * every)) + 1
+        nstart = end
+        nend = min(int(np.floor((i + 2) * every)) + 1, n)
+        if nend <= nstart:
+            nend = nstart + 1
+
+        avg_x = x[nstart:nend].mean()
+        avg_y = y[nstart:nend].mean()
+
+        ax, ay = x[a], y[a]
+        area = np.abs(
+            (ax - avg_x) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y - ay)
+        )
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+
+    return out
+
+def bucket_seconds_for(range_seconds: float, target_points: int, oversample: int = 4, min_seconds: int = 60) -> int:
+    """
+    Tamaño de bucket (segundos) para la agregación en SQL: deja ~oversample
+    veces más puntos que el objetivo, para que LTTB tenga forma que preservar.
+    """
+    if target_points <= 0:
+        return min_seconds
+    return max(min_seconds, math.ceil(range_seconds / (target_points * oversample)))
@@ -0,0 +1,151 @@
+# backend/app/utils/search_index.py
+from __future__ import annotations
+import bisect
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Callable
+
+log = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Pesos de ranking
+SCORE_EXACT_ID = 100.0
+SCORE_ID_PREFIX = 40.0
+SCORE_ALL_TOKENS = 20.0
+SCORE_TRIGRAM = 10.0
+MIN_TRIGRAM_SIM = 0.3
+
+
+def normalize(text: str | None) -> str:
+    """Minúsculas, sin tildes y sólo alfanuméricos separados por un espacio."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class StationIndex:
+    """
+    Índice inmutable en memoria sobre estaciones:
+    - código exacto y por prefijo (client_id)
+    - prefijo por palabra sobre razón social y zona
+    - trigramas (tolera errores de tipeo y palabras parciales)
+    """
+
+    def __init__(self, records: list[dict]):
+        self.records = records
+        self.built_at = time.time()
+
+        self._by_id: dict[str, list[int]] = defaultdict(list)
+        postings: dict[str, set[int]] = defaultdict(set)
+        grams: dict[str, set[int]] = defaultdict(set)
+
+        for i, rec in enumerate(records):
+            cid = str(rec.get("client_id") or "")
+            if cid:
+                self._by_id[cid].append(i)
+            text = normalize(f"{rec.get('client_description') or ''} {rec.get('zone_name') or ''}")
+            for tok in text.split():
+                postings[tok].add(i)
+            for g in trigrams(text):
+                grams[g].add(i)
+
+        self._ids = sorted(self._by_id)
+        self._tokens = sorted(postings)
+        self._postings = dict(postings)
+        self._grams = dict(grams)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _prefix(self, sorted_keys: list[str], prefix: str):
+        i = bisect.bisect_left(sorted_keys, prefix)
+        while i < len(sorted_keys) and sorted_keys[i].startswith(prefix):
+            yield sorted_keys[i]
+            i += 1
+
+    def search(self, query: str, limit: int = 20) -> list[tuple[dict, float]]:
+        nq = normalize(query)
+        if not nq:
+            return []
+        scores: dict[int, float] = defaultdict(float)
+
+        # 1) Código de estación: exacto o prefijo
+        if nq.isdigit():
+            for i in self._by_id.get(nq, ()):
+                scores[i] += SCORE_EXACT_ID
+            for cid in self._prefix(self._ids, nq):
+                if cid != nq:
+                    for i in self._by_id[cid]:
+                        scores[i] += SCORE_ID_PREFIX * len(nq) / len(cid)
+
+        # 2) Todas las palabras de la búsqueda son prefijo de alguna palabra
+        hits: set[int] | None = None
+        for tok in nq.split():
+            docs: set[int] = set()
+            for t in self._prefix(self._tokens, tok):
+                docs |= self._postings[t]
+            hits = docs if hits is None else hits & docs
+            if not hits:
+                break
+        for i in hits or ():
+            scores[i] += SCORE_ALL_TOKENS
+
+        # 3) Similitud por trigramas
+        qgrams = trigrams(nq)
+        counts: Counter[int] = Counter()
+        for g in qgrams:
+            counts.update(self._grams.get(g, ()))
+        for i, c in counts.items():
+            sim = c / len(qgrams)
+            if sim >= MIN_TRIGRAM_SIM:
+                scores[i] += SCORE_TRIGRAM * sim
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda kv: (-kv[1], int(self.records[kv[0]].get("client_id") or 0)),
+        )
+        return [(self.records[i], round(score, 3)) for i, score in ranked[:limit]]
+
+
+class RefreshingIndex:
+    """
+    Mantiene un StationIndex vigente fuera del camino de las requests: lo
+    construye y refresca el scheduler de precarga (refresh_if_stale) y las
+    búsquedas sólo leen el índice ya construido (None mientras no exista).
+    """
+
+    def __init__(self, loader: Callable[[], list[dict]], max_age: float):
+        self.loader = loader
+        self.max_age = max_age
+        self._index: StationIndex | None = None
+        self._lock = threading.Lock()
+
+    def get(self) -> StationIndex | None:
+        return self._index
+
+    def is_stale(self) -> bool:
+        return self._index is None or time.time() - self._index.built_at > self.max_age
+
+    def refresh_if_stale(self) -> None:
+        if not self.is_stale():
+            return
+        with self._lock:
+            if not self.is_stale():
+                return
+            try:
+                self._index = StationIndex(self.loader())
+            except Exception as e:
+                # Se sigue respondiendo con el índice anterior; el scheduler reintenta
+                log.warning("station index refresh failed: %s", e)
@@ -0,0 +1,339 @@
+# backend/app/utils/sql.py
+"""
+Construcción de queries Athena amigable con particiones y predicate pushdown.
+
+Un filtro sobre una columna de tipo nativo (int, date, timestamp) se emite
+tal cual. Las columnas guardadas como texto (códigos numéricos, epoch, fechas
+'YYYY-MM-DD') se filtran por defecto con la forma original (CAST / try_cast),
+porque compararlas como texto cambia el resultado si el formato no es fijo
+('01202' ≠ '1202', epoch de 13 dígitos, fechas no ISO). Sólo las columnas
+listadas en ATHENA_RAW_PREDICATES, después de que scripts/scan_report.py
+confirmó que ambas formas devuelven las mismas filas, se comparan contra el
+tipo crudo (lo que permite usar las estadísticas min/max de Parquet).
+
+Si una tabla declara una columna de partición por fecha (ATHENA_DATE_PARTITIONS)
+los rangos de tiempo también la filtran; sin ella no hay poda de particiones.
+
+Cada filtro sabe renderizarse en modo 'legacy' (las expresiones originales
+con CAST) para poder comparar antes/después (ver scripts/scan_report.py).
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Callable, Iterable, Iterator
+
+from ..config import settings
+
+# Mapeo de producto (único lugar: routers, CASE SQL y exportaciones)
+PRODUCT_MAP = {
+    7: "Kerosene",
+    6: "Gasolina 97",
+    4: "Gasolina 93",
+    5: "Gasolina 95",
+    1: "Petróleo Diésel",
+}
+PRODUCT_ORDER = [7, 6, 4, 5, 1]  # orden de salida
+PRODUCT_IDS = sorted(PRODUCT_MAP)
+
+# Tipos crudos en el catálogo:
+#   int / bigint / double   → numérico nativo
+#   varchar                 → texto (códigos numéricos guardados como texto)
+#   epoch_varchar           → segundos epoch como texto de 10 dígitos
+#   date_varchar            → fecha 'YYYY-MM-DD' como texto
+#   date / timestamp        → nativos
+NUMERIC = {"int", "bigint", "double"}
+NATIVE = NUMERIC | {"date", "timestamp"}
+
+
+def _parse_partitions(raw: str) -> dict[str, str]:
+    # "db.tabla=columna,db.otra=col" (columna 'YYYY-MM-DD')
+    out = {}
+    for item in raw.split(","):
+        if "=" in item:
+            table, col = item.split("=", 1)
+            out[table.strip()] = col.strip()
+    return out
+
+
+_DATE_PARTITIONS = _parse_partitions(settings.athena_date_partitions)
+# "db.tabla.columna,…": columnas de texto verificadas para comparar en su tipo crudo
+_RAW_VERIFIED = frozenset(c.strip() for c in settings.athena_raw_predicates.split(",") if c.strip())
+
+_ALL = "*"
+_raw_override: ContextVar[frozenset[str] | None] = ContextVar("sql_raw_override", default=None)
+_raw_used: ContextVar[set[str] | None] = ContextVar("sql_raw_used", default=None)
+
+
+@contextmanager
+def raw_predicates(columns: Iterable[str] | None = None) -> Iterator[None]:
+    """
+    Ignora ATHENA_RAW_PREDICATES: usa el tipo crudo sólo para 'columns'
+    ('db.tabla.columna') o, con None, para todas. Para scripts/scan_report.py.
+    """
+    token = _raw_override.set(frozenset([_ALL] if columns is None else columns))
+    try:
+        yield
+    finally:
+        _raw_override.reset(token)
+
+
+@contextmanager
+def tracking_columns() -> Iterator[set[str]]:
+    """Recolecta las columnas de texto sobre las que se decidió forma cruda vs. legacy."""
+    used: set[str] = set()
+    token = _raw_used.set(used)
+    try:
+        yield used
+    finally:
+        _raw_used.reset(token)
+
+
+@dataclass(frozen=True)
+class Table:
+    name: str
+    types: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def date_partition(self) -> str | None:
+        return _DATE_PARTITIONS.get(self.name)
+
+    def type_of(self, col: str) -> str:
+        return self.types.get(col, "varchar")
+
+    def qualified(self, col: str) -> str:
+        return f"{self.name}.{col}"
+
+
+ETLIST = Table("logistica_scr_staging.etlist", {
+    "werksreal": "varchar",
+    "kunag": "varchar",
+    "auart": "varchar",
+    "vdatu": "date_varchar",
+})
+TELEMEDICION = Table("copecfuel_staging.telemedicion_detalle", {
+    "ubicacioncodigo": "varchar",
+    "tanque": "varchar",
+    "protucto": "int",
+    "telemedicionfecha": "epoch_varchar",
+    "fechaultimalect": "epoch_varchar",
+})
+PREDICCION = Table("modelos_analytics.prediccion_demanda_eds_resultados", {
+    "estacion": "varchar",
+    "producto": "varchar",
+    "fecha": "timestamp",
+})
+VENTA_MENSUAL = Table("venta_concesionario_staging.venta_mensual")
+JEFES_ZONA = Table("maestros_staging.maestro_jefes_zona")
+
+
+def product_case(expr: str) -> str:
+    """CASE <expr> WHEN id THEN 'nombre' … generado desde PRODUCT_MAP."""
+    whens = "\n".join(f"    WHEN {pid} THEN '{name}'" for pid, name in PRODUCT_MAP.items())
+    return f"CASE {expr}\n{whens}\n    ELSE CAST({expr} AS VARCHAR)\n  END"
+
+
+def _lit(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _epoch(dt: datetime | int) -> int:
+    if isinstance(dt, int):
+        return dt
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((dt - datetime(1970, 1, 1)).total_seconds())
+
+
+def _as_datetime(value: datetime | int) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(seconds=_epoch(value))
+
+
+def months_ago(d: date, months: int) -> date:
+    """Equivalente a date_add('month', -months, d) de Athena (ajusta fin de mes)."""
+    y, m = divmod(d.year * 12 + d.month - 1 - months, 12)
+    m += 1
+    for day in (d.day, 30, 29, 28):
+        try:
+            return date(y, m, day)
+        except ValueError:
+            continue
+    return date(y, m, 28)
+
+
+class Where:
+    """
+    Acumula predicados (AND) y sus parámetros para una tabla.
+    'prefix' evita choques de nombres de parámetro entre CTEs de una misma query.
+    """
+
+    def __init__(self, table: Table, alias: str = "", prefix: str = "", legacy: bool = False):
+        self.table = table
+        self.alias = alias
+        self.prefix = prefix
+        self.legacy = legacy
+        self.clauses: list[str] = []
+        self.params: dict = {}
+
+    # -- helpers ---------------------------------------------------------
+    def _col(self, col: str) -> str:
+        return f"{self.alias}.{col}" if self.alias else col
+
+    def _param(self, name: str, value) -> str:
+        key = f"{self.prefix}{name}"
+        self.params[key] = value
+        return f"%({key})s"
+
+    def _is_text(self, col: str) -> bool:
+        return self.table.type_of(col) not in NUMERIC
+
+    def _raw(self, col: str) -> bool:
+        """¿Se compara 'col' en su tipo crudo? Siempre si es nativo; si es texto, sólo verificada."""
+        if self.legacy:
+            return False
+        if self.table.type_of(col) in NATIVE:
+            return True
+        q = self.table.qualified(col)
+        used = _raw_used.get()
+        if used is not None:
+            used.add(q)
+        override = _raw_override.get()
+        if override is None:
+            return q in _RAW_VERIFIED
+        return _ALL in override or q in override
+
+    @property
+    def sql(self) -> str:
+        return "\n    AND ".join(self.clauses) if self.clauses else "TRUE"
+
+    def raw(self, clause: str) -> "Where":
+        self.clauses.append(clause)
+        return self
+
+    # -- igualdad / pertenencia -----------------------------------------
+    def eq_int(self, col: str, name: str, value: int) -> "Where":
+        c = self._col(col)
+        if not self._raw(col):
+            return self.raw(f"CAST({c} AS INTEGER) = {self._param(name, int(value))}")
+        if self._is_text(col):
+            return self.raw(f"{c} = {self._param(name, str(int(value)))}")
+        return self.raw(f"{c} = {self._param(name, int(value))}")
+
+    def in_ints(self, col: str, values: Iterable[int]) -> "Where":
+        c = self._col(col)
+        values = [int(v) for v in values]
+        if not self._raw(col) and self._is_text(col):
+            return self.raw(f"CAST({c} AS INTEGER) IN ({','.join(map(str, values))})")
+        if self._is_text(col):
+            return self.raw(f"{c} IN ({','.join(_lit(v) for v in values)})")
+        return self.raw(f"{c} IN ({','.join(map(str, values))})")
+
+    def in_strs(self, col: str, values: Iterable[str]) -> "Where":
+        return self.raw(f"{self._col(col)} IN ({', '.join(_lit(v) for v in values)})")
+
+    def in_select(self, col: str, select_int_sql: str) -> "Where":
+        """col ∈ (subquery que entrega un entero), comparando en el tipo crudo de col."""
+        c = self._col(col)
+        if not self._raw(col):
+            return self.raw(f"CAST({c} AS INTEGER) IN ({select_int_sql})")
+        if self._is_text(col):
+            return self.raw(f"{c} IN (SELECT CAST(x AS VARCHAR) FROM ({select_int_sql}) AS s(x))")
+        return self.raw(f"{c} IN ({select_int_sql})")
+
+    # -- rangos de tiempo ------------------------------------------------
+    def epoch_range(
+        self, col: str, name: str, start: datetime | int | None = None, end: datetime | int | None = None
+    ) -> "Where":
+        """
+        Columna epoch en segundos. Si es texto, la comparación cruda es
+        lexicográfica: sólo equivale a la numérica con epoch de 10 dígitos.
+        """
+        c = self._col(col)
+        if not self._raw(col):
+            expr = f"try_cast({c} AS bigint)"
+            if start is not None:
+                self.raw(f"{expr} >= {self._param(name + '_from', _epoch(start))}")
+            if end is not None:
+                self.raw(f"{expr} <= {self._param(name + '_to', _epoch(end))}")
+            self._partition(
+                name,
+                None if start is None else _as_datetime(start),
+                None if end is None else _as_datetime(end),
+            )
+            return self
+        text = self._is_text(col)
+        if start is not None:
+            v = _epoch(start)
+            self.raw(f"{c} >= {self._param(name + '_from', str(v) if text else v)}")
+        if end is not None:
+            v = _epoch(end)
+            self.raw(f"{c} <= {self._param(name + '_to', str(v) if text else v)}")
+        self._partition(
+            name,
+            None if start is None else _as_datetime(start),
+            None if end is None else _as_datetime(end),
+        )
+        return self
+
+    def since_hours(self, col: str, name: str, hours: float, quantum_s: int = 300) -> "Where":
+        """Últimas N horas; el borde se redondea a 'quantum_s' para que el cache reutilice la query."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        edge = now - timedelta(hours=hours)
+        return self.epoch_range(col, name, start=(_epoch(edge) // quantum_s) * quantum_s)
+
+    def date_range(self, col: str, name: str, start: date | None = None, end: date | None = None) -> "Where":
+        """Columna date/timestamp/date_varchar entre dos fechas (inclusive)."""
+        c = self._col(col)
+        kind = self.table.type_of(col)
+        raw = self._raw(col)
+        if kind == "date_varchar" and not raw:
+            expr = f"try_cast({c} AS DATE)"
+        else:
+            expr = c
+        wrap = (lambda p: p) if kind == "date_varchar" and raw else (lambda p: f"DATE({p})")
+        if start is not None and end is not None:
+            self.raw(f"{expr} BETWEEN {wrap(self._param(name + '_from', start.isoformat()))} "
+                     f"AND {wrap(self._param(name + '_to', end.isoformat()))}")
+        elif start is not None:
+            self.raw(f"{expr} >= {wrap(self._param(name + '_from', start.isoformat()))}")
+        elif end is not None:
+            self.raw(f"{expr} <= {wrap(self._param(name + '_to', end.isoformat()))}")
+        if not self.legacy:
+            self._partition(
+                name,
+                None if start is None else datetime.combine(start, time.min),
+                None if end is None else datetime.combine(end, time.max),
+            )
+        return self
+
+    def _partition(self, name: str, start: datetime | None, end: datetime | None) -> None:
+        part = self.table.date_partition
+        if not part or self.legacy:
+            return
+        c = self._col(part)
+        if start is not None:
+            self.raw(f"{c} >= {self._param(name + '_pfrom', start.date().isoformat())}")
+        if end is not None:
+            self.raw(f"{c} <= {self._param(name + '_pto', end.date().isoformat())}")
+
+
+def merge_params(*wheres: Where, **extra) -> dict:
+    out: dict = {}
+    for w in wheres:
+        out.update(w.params)
+    out.update(extra)
+    return out
+
+
+# Registro de builders para el reporte de bytes escaneados (scripts/scan_report.py)
+QueryBuilder = Callable[..., tuple[str, dict]]
+REGISTRY: dict[str, QueryBuilder] = {}
+
+
+def register(name: str) -> Callable[[QueryBuilder], QueryBuilder]:
+    def deco(fn: QueryBuilder) -> QueryBuilder:
+        REGISTRY[name] = fn
+        return fn
+    return deco
@@ -0,0 +1,149 @@
+# backend/scripts/bench_startup.py
+"""
+Benchmark de arranque en frío del backend, con presupuesto.
+
+Mide, cada uno en un proceso nuevo (sin caches de import calientes en memoria):
+1. tiempo de `import app.main` y los módulos más caros (python -X importtime);
+2. que pandas / numpy / pyathena / boto3 / pyarrow NO se importen al arrancar;
+3. tiempo desde lanzar uvicorn hasta la primera respuesta 200 de /health.
+
+Se mide el arranque en sí, con el scheduler apagado (SCHEDULER_ENABLED=false,
+WARMUP_ENABLED=false): con un .env real, la precarga y el índice de búsqueda
+lanzarían queries a Athena e importarían pandas/pyathena en segundo plano
+mientras se cronometra /health. El resto de la configuración sale del .env.
+
+Sale con código 1 si se excede algún presupuesto (útil en CI o antes de un deploy).
+
+Uso (desde backend/):
+    python -m scripts.bench_startup
+    python -m scripts.bench_startup --import-budget 1.0 --health-budget 2.5 --runs 5
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+HEAVY_MODULES = ("pandas", "numpy", "pyathena", "boto3", "botocore", "pyarrow", "altair")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("API_KEY", "bench-startup")
+    # Sin trabajo de fondo: ni queries reales a Athena ni imports pesados durante la medición
+    env["SCHEDULER_ENABLED"] = "false"
+    env["WARMUP_ENABLED"] = "false"
+    return env
+
+
+def measure_import() -> tuple[float, list[str]]:
+    code = (
+        "import sys, time\n"
+        "t = time.perf_counter()\n"
+        "import app.main\n"
+        "print(time.perf_counter() - t)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True
+    ).stdout.split("\n")
+    return float(out[0]), [m for m in out[1].split(",") if m]
+
+
+def top_imports(n: int = 10) -> list[tuple[float, str]]:
+    """Módulos con mayor tiempo acumulado según -X importtime (segundos)."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (p.strip() for p in line[len("import time:"):].split("|"))
+        if not name.startswith(" "):
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_first_health(timeout: float = 60.0) -> float:
+    env = _env()
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+            try:
+                req = urllib.request.Request(url, headers={"X-API-Key": env["API_KEY"]})
+                with urllib.request.urlopen(req, timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - t0
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.02)
+        raise TimeoutError(f"/health did not answer within {timeout:.0f}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=3, help="repeticiones (se informa la mediana)")
+    ap.add_argument("--import-budget", type=float, default=float(os.getenv("STARTUP_IMPORT_BUDGET", "1.5")))
+    ap.add_argument("--health-budget", type=float, default=float(os.getenv("STARTUP_HEALTH_BUDGET", "3.0")))
+    ap.add_argument("--top", type=int, default=10, help="módulos más caros a listar")
+    args = ap.parse_args(argv)
+
+    imports, heavy = [], []
+    for _ in range(args.runs):
+        t, heavy = measure_import()
+        imports.append(t)
+    health = [measure_first_health() for _ in range(args.runs)]
+    import_s, health_s = statistics.median(imports), statistics.median(health)
+
+    print(f"import app.main      : {import_s:6.3f}s  (presupuesto {args.import_budget:.2f}s)")
+    print(f"primer /health 200   : {health_s:6.3f}s  (presupuesto {args.health_budget:.2f}s)")
+    print(f"módulos pesados      : {', '.join(heavy) if heavy else 'ninguno'}")
+    print("imports más caros (acumulado):")
+    for seconds, name in top_imports(args.top):
+        print(f"  {seconds:6.3f}s  {name}")
+
+    failed = []
+    if import_s > args.import_budget:
+        failed.append("import")
+    if health_s > args.health_budget:
+        failed.append("/health")
+    if heavy:
+        failed.append("imports pesados al arrancar")
+    if failed:
+        print(f"FUERA DE PRESUPUESTO: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
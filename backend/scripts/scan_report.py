@@ -0,0 +1,119 @@
+# backend/scripts/scan_report.py
+"""
+Reporte antes/después del query builder: bytes escaneados y equivalencia.
+
+Ejecuta cada query registrada (app.utils.sql.REGISTRY) en su forma legacy
+(predicados con CAST sobre la columna) y con todas sus columnas de texto en
+el tipo crudo, sin pasar por el cache, y compara bytes escaneados, tiempo de
+motor, filas y un checksum del resultado. Si el resultado difiere, repite con
+una columna cruda a la vez para identificar cuáles lo cambian.
+
+Al final sugiere ATHENA_RAW_PREDICATES con las columnas que dieron el mismo
+resultado en todas las queries donde aparecen; el resto sigue con la forma
+CAST original.
+
+Uso (desde backend/):
+    python -m scripts.scan_report --client-id 10080 --plant-id 1202
+    python -m scripts.scan_report --only telemetry. --only demand.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import inspect
+import sys
+from typing import NamedTuple
+
+from app.deps.athena import get_athena_connection
+from app.routers import demand, export, plants, stations, telemetry  # noqa: F401  (registran sus queries)
+from app.utils.sql import REGISTRY, raw_predicates, tracking_columns
+
+
+class Run(NamedTuple):
+    scanned: int | None
+    engine_ms: int | None
+    rows: int
+    checksum: str
+
+
+def _normalize(value):
+    # Los agregados DOUBLE pueden variar en los últimos decimales entre ejecuciones
+    return round(value, 6) if isinstance(value, float) else value
+
+
+def _run(sql: str, params: dict) -> Run:
+    cur = get_athena_connection().cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    digest = hashlib.sha256()
+    for line in sorted(repr(tuple(_normalize(v) for v in row)) for row in rows):
+        digest.update(line.encode("utf-8"))
+    return Run(cur.data_scanned_in_bytes, cur.engine_execution_time_in_millis, len(rows), digest.hexdigest()[:12])
+
+
+def _same(a: Run, b: Run) -> bool:
+    return a.rows == b.rows and a.checksum == b.checksum
+
+
+def _mb(n: int | None) -> str:
+    return "-" if n is None else f"{n / 1024 / 1024:,.1f}"
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--client-id", type=int, default=10080)
+    ap.add_argument("--plant-id", type=int, default=1202)
+    ap.add_argument("--only", action="append", default=[], help="prefijo de nombre de query (repetible)")
+    args = ap.parse_args(argv)
+
+    sample = {"client_id": args.client_id, "plant_id": args.plant_id}
+    print(
+        f"{'query':28} {'legacy MB':>12} {'crudo MB':>12} {'ahorro':>8} {'ms legacy':>10} {'ms crudo':>10} "
+        f"{'filas legacy':>13} {'filas crudo':>12}  resultado"
+    )
+    failed = False
+    seen: set[str] = set()
+    differs: dict[str, list[str]] = {}
+    for name, build in sorted(REGISTRY.items()):
+        if args.only and not any(name.startswith(p) for p in args.only):
+            continue
+        kwargs = {k: v for k, v in sample.items() if k in inspect.signature(build).parameters}
+        try:
+            before = _run(*build(**kwargs, legacy=True))
+            with tracking_columns() as columns, raw_predicates():
+                after = _run(*build(**kwargs, legacy=False))
+            seen |= columns
+            if _same(before, after):
+                verdict = "igual"
+            else:
+                # Una columna cruda a la vez para aislar cuál cambia el resultado
+                culprits = []
+                for col in sorted(columns):
+                    with raw_predicates([col]):
+                        if not _same(before, _run(*build(**kwargs, legacy=False))):
+                            culprits.append(col)
+                            differs.setdefault(col, []).append(name)
+                verdict = "DIFIERE: " + (", ".join(c.rsplit(".", 1)[1] for c in culprits) or "combinación de columnas")
+                if not culprits:
+                    for col in columns:
+                        differs.setdefault(col, []).append(name)
+        except Exception as e:
+            print(f"{name:28} ERROR: {e}")
+            failed = True
+            continue
+        saved = "-" if not before.scanned or after.scanned is None else f"{(1 - after.scanned / before.scanned) * 100:.0f}%"
+        print(
+            f"{name:28} {_mb(before.scanned):>12} {_mb(after.scanned):>12} {saved:>8} "
+            f"{before.engine_ms or '-':>10} {after.engine_ms or '-':>10} {before.rows:>13} {after.rows:>12}  {verdict}"
+        )
+
+    print()
+    for col, names in sorted(differs.items()):
+        print(f"mantener CAST en {col}: difiere en {', '.join(names)}")
+    safe = sorted(seen - set(differs))
+    print(f"ATHENA_RAW_PREDICATES={','.join(safe)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+# backend/tests/conftest.py
+import os
+
+# Antes de importar app.*: sin .env real, sin Athena en segundo plano ni cache en disco
+os.environ.setdefault("API_KEY", "test-key")
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["SCHEDULER_ENABLED"] = "false"
+os.environ["WARMUP_ENABLED"] = "false"
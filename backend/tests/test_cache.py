@@ -0,0 +1,199 @@
+# backend/tests/test_cache.py
+import threading
+
+import pytest
+
+from app.deps import cache as cache_mod
+from app.deps.cache import MISS, MemoryBackend, SQLiteBackend, flight_group, refreshing, set_cache_backend
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_mod, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def cache():
+    # Reemplazo en memoria del backend de red/disco (el mismo que usa la app con CACHE_BACKEND=memory)
+    return set_cache_backend(MemoryBackend(max_bytes=1024 * 1024))
+
+
+# -- MemoryBackend ----------------------------------------------------------
+
+def test_memory_ttl_expires(clock):
+    b = MemoryBackend(max_bytes=100)
+    b.set("k", b"v", ttl=10)
+    assert b.get("k") == b"v"
+    clock.now += 11
+    assert b.get("k") is None
+
+
+def test_memory_evicts_least_recently_used_by_size(clock):
+    b = MemoryBackend(max_bytes=10)
+    b.set("a", b"1234", ttl=60)
+    b.set("b", b"1234", ttl=60)
+    assert b.get("a") == b"1234"  # 'a' pasa a ser la más reciente
+    b.set("c", b"1234", ttl=60)
+    assert b.get("b") is None
+    assert b.get("a") == b"1234" and b.get("c") == b"1234"
+
+
+def test_memory_add_is_set_if_absent(clock):
+    b = MemoryBackend(max_bytes=100)
+    assert b.add("lease", b"1", ttl=10)
+    assert not b.add("lease", b"2", ttl=10)
+    assert b.get("lease") == b"1"
+    clock.now += 11
+    assert b.add("lease", b"3", ttl=10)
+
+
+# -- SQLiteBackend ----------------------------------------------------------
+
+def _total(b: SQLiteBackend) -> int:
+    return b._total(b._conn())
+
+
+def test_sqlite_roundtrip_and_ttl(tmp_path, clock):
+    b = SQLiteBackend(str(tmp_path / "c.sqlite3"), max_bytes=1000)
+    b.set("k", b"value", ttl=10)
+    assert b.get("k") == b"value"
+    clock.now += 11
+    assert b.get("k") is None
+
+
+def test_sqlite_tracks_total_size_incrementally(tmp_path, clock):
+    b = SQLiteBackend(str(tmp_path / "c.sqlite3"), max_bytes=1000)
+    b.set("a", b"x" * 10, ttl=60)
+    b.set("b", b"x" * 20, ttl=60)
+    assert _total(b) == 30
+    b.set("a", b"x" * 5, ttl=60)   # sobrescribir ajusta el total (upsert, no REPLACE)
+    assert _total(b) == 25
+    b.delete("b")
+    assert _total(b) == 5
+    b.clear()
+    assert _total(b) == 0
+
+
+def test_sqlite_evicts_least_recently_used(tmp_path, clock):
+    b = SQLiteBackend(str(tmp_path / "c.sqlite3"), max_bytes=25)
+    b.set("a", b"x" * 10, ttl=600)
+    clock.now += 1
+    b.set("b", b"x" * 10, ttl=600)
+    clock.now += SQLiteBackend.TOUCH_INTERVAL + 1
+    assert b.get("a") is not None  # renueva accessed_at de 'a'
+    clock.now += 1
+    b.set("c", b"x" * 10, ttl=600)
+    assert b.get("b") is None
+    assert b.get("a") is not None and b.get("c") is not None
+    assert _total(b) == 20
+
+
+def test_sqlite_add_is_atomic_set_if_absent(tmp_path, clock):
+    path = str(tmp_path / "c.sqlite3")
+    b1, b2 = SQLiteBackend(path, max_bytes=1000), SQLiteBackend(path, max_bytes=1000)
+    assert b1.add("lease", b"w1", ttl=10)
+    assert not b2.add("lease", b"w2", ttl=10)
+    clock.now += 11
+    assert b2.add("lease", b"w2", ttl=10)
+    assert b1.get("lease") == b"w2"
+
+
+# -- Cache (fachada) ----------------------------------------------------------
+
+def test_make_key_is_stable_and_order_independent(cache):
+    assert cache.make_key("sql", "SELECT 1", {"a": 1, "b": 2}) == cache.make_key("sql", "SELECT 1", {"b": 2, "a": 1})
+    assert cache.make_key("sql", "SELECT 1", {"a": 1}) != cache.make_key("sql", "SELECT 1", {"a": 2})
+
+
+def test_get_or_set_caches_value(cache):
+    calls = []
+    assert cache.get_or_set("k", lambda: calls.append(1) or "v", ttl=60) == "v"
+    assert cache.get_or_set("k", lambda: calls.append(1) or "other", ttl=60) == "v"
+    assert len(calls) == 1
+
+
+def test_get_or_set_ttl_zero_is_not_stored(cache):
+    cache.get_or_set("k", lambda: "v", ttl=0)
+    assert cache.get("k") is MISS
+
+
+def test_get_or_set_refreshing_recomputes(cache):
+    cache.set("k", "old", ttl=60)
+    with refreshing():
+        assert cache.get_or_set("k", lambda: "new", ttl=60) == "new"
+    assert cache.get("k") == "new"
+
+
+def test_get_or_set_single_flight(cache):
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "v"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("k", compute, ttl=60))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert results == ["v"] * 8
+    assert len(calls) == 1
+
+
+def test_get_or_set_other_flight_group_does_not_wait(cache):
+    # Un cálculo de segundo plano bloqueado no frena al del grupo interactivo
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "background"
+
+    def run_background():
+        flight_group.set(2)
+        cache.get_or_set("k", slow, ttl=60)
+
+    t = threading.Thread(target=run_background)
+    t.start()
+    assert started.wait(5)
+    try:
+        assert cache.get_or_set("k", lambda: "interactive", ttl=60) == "interactive"
+    finally:
+        release.set()
+        t.join(5)
+
+
+def test_cache_swallows_backend_errors():
+    class Broken:
+        def get(self, key):
+            raise RuntimeError("down")
+
+        def set(self, key, value, ttl):
+            raise RuntimeError("down")
+
+        def add(self, key, value, ttl):
+            raise RuntimeError("down")
+
+        def delete(self, key):
+            raise RuntimeError("down")
+
+        def clear(self):
+            pass
+
+    c = set_cache_backend(Broken())
+    assert c.get_or_set("k", lambda: "v", ttl=60) == "v"
+    assert c.add("lease", 1) is True
@@ -0,0 +1,43 @@
+# backend/tests/test_downsampling.py
+import numpy as np
+
+from app.utils.downsampling import bucket_seconds_for, lttb_indices
+
+
+def test_lttb_returns_all_points_when_no_reduction_needed():
+    x = np.arange(10)
+    y = np.arange(10)
+    assert list(lttb_indices(x, y, 10)) == list(range(10))
+    assert list(lttb_indices(x, y, 50)) == list(range(10))
+    assert list(lttb_indices(x, y, 2)) == list(range(10))
+
+
+def test_lttb_keeps_endpoints_and_threshold():
+    x = np.arange(1000)
+    y = np.sin(x / 20.0)
+    idx = lttb_indices(x, y, 100)
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == 999
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_lttb_preserves_spike():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[537] = 50.0
+    assert 537 in set(lttb_indices(x, y, 50).tolist())
+
+
+def test_lttb_accepts_float_timestamps():
+    x = np.linspace(1.7e9, 1.7e9 + 86400, 500)
+    y = np.cos(np.arange(500) / 10.0)
+    idx = lttb_indices(x, y, 60)
+    assert len(idx) == 60
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_bucket_seconds_for():
+    # 14 días a 300 puntos con sobremuestreo 4 -> ~1008 s por bucket
+    assert bucket_seconds_for(14 * 86400, 300) == 1008
+    assert bucket_seconds_for(3600, 300) == 60   # nunca bajo min_seconds
+    assert bucket_seconds_for(3600, 0) == 60
@@ -0,0 +1,94 @@
+# backend/tests/test_search_index.py
+import pytest
+
+from app.utils.search_index import (
+    SCORE_ALL_TOKENS, SCORE_EXACT_ID, RefreshingIndex, StationIndex, normalize, trigrams,
+)
+
+RECORDS = [
+    {"plant_id": 1202, "client_id": 10080, "client_description": "Estación Maipú Centro", "zone_name": "Santiago Sur"},
+    {"plant_id": 1202, "client_id": 100801, "client_description": "Servicentro Pudahuel Norte", "zone_name": "Santiago Poniente"},
+    {"plant_id": 1210, "client_id": 20055, "client_description": "EDS Ruta 5 Rancagua", "zone_name": "O'Higgins"},
+    {"plant_id": 1210, "client_id": 20056, "client_description": None, "zone_name": None},
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return StationIndex(RECORDS)
+
+
+def _ids(results):
+    return [rec["client_id"] for rec, _ in results]
+
+
+def test_normalize_strips_accents_and_symbols():
+    assert normalize("  Estación  Maipú-Centro! ") == "estacion maipu centro"
+    assert normalize(None) == ""
+
+
+def test_trigrams_are_padded():
+    assert {"  a", " ab", "ab "} <= trigrams("ab")
+
+
+def test_exact_id_ranks_above_prefix(index):
+    results = index.search("10080")
+    assert _ids(results)[:2] == [10080, 100801]
+    assert results[0][1] == SCORE_EXACT_ID
+    assert 0 < results[1][1] < SCORE_EXACT_ID
+
+
+def test_id_prefix_only(index):
+    assert set(_ids(index.search("2005"))) == {20055, 20056}
+
+
+def test_all_words_as_prefixes(index):
+    results = index.search("pudah nor")
+    assert _ids(results)[0] == 100801
+    assert results[0][1] >= SCORE_ALL_TOKENS
+
+
+def test_accents_and_zone_are_searchable(index):
+    assert _ids(index.search("MAIPU"))[0] == 10080
+    assert _ids(index.search("o higgins"))[0] == 20055
+
+
+def test_trigrams_tolerate_typos(index):
+    results = index.search("rancgua")
+    assert _ids(results)[0] == 20055
+    assert results[0][1] < SCORE_ALL_TOKENS  # sólo por similitud, no por prefijo
+
+
+def test_empty_and_unknown_queries(index):
+    assert index.search("   ") == []
+    assert index.search("zzzzqqq") == []
+
+
+def test_limit(index):
+    assert len(index.search("santiago", limit=1)) == 1
+
+
+def test_refreshing_index_builds_and_keeps_previous_on_failure():
+    calls = {"n": 0}
+
+    def loader():
+        calls["n"] += 1
+        if calls["n"] > 1:
+            raise RuntimeError("athena down")
+        return RECORDS
+
+    ri = RefreshingIndex(loader, max_age=0)
+    assert ri.get() is None
+    ri.refresh_if_stale()
+    first = ri.get()
+    assert first is not None and len(first) == len(RECORDS)
+    ri.refresh_if_stale()  # vencido (max_age=0) y el loader falla
+    assert ri.get() is first
+
+
+def test_refreshing_index_skips_when_fresh():
+    calls = []
+    ri = RefreshingIndex(lambda: calls.append(1) or RECORDS, max_age=3600)
+    ri.refresh_if_stale()
+    ri.refresh_if_stale()
+    assert len(calls) == 1
@@ -0,0 +1,128 @@
+# backend/tests/test_sql.py
+from datetime import date, datetime
+
+import pytest
+
+from app.utils import sql
+from app.utils.sql import (
+    ETLIST, PREDICCION, TELEMEDICION, Where, merge_params, months_ago, raw_predicates, tracking_columns,
+)
+
+
+@pytest.fixture(autouse=True)
+def no_config(monkeypatch):
+    # Sin columnas verificadas ni particiones, salvo que el test las declare
+    monkeypatch.setattr(sql, "_RAW_VERIFIED", frozenset())
+    monkeypatch.setattr(sql, "_DATE_PARTITIONS", {})
+
+
+def test_text_column_keeps_cast_form_by_default():
+    w = Where(ETLIST, alias="e").eq_int("werksreal", "plant_id", 1202)
+    assert w.sql == "CAST(e.werksreal AS INTEGER) = %(plant_id)s"
+    assert w.params == {"plant_id": 1202}
+
+
+def test_legacy_matches_default_for_unverified_columns():
+    default = Where(ETLIST, alias="e").eq_int("werksreal", "plant_id", 1202)
+    legacy = Where(ETLIST, alias="e", legacy=True).eq_int("werksreal", "plant_id", 1202)
+    assert default.sql == legacy.sql and default.params == legacy.params
+
+
+def test_verified_text_column_compares_raw(monkeypatch):
+    monkeypatch.setattr(sql, "_RAW_VERIFIED", frozenset({"logistica_scr_staging.etlist.werksreal"}))
+    w = Where(ETLIST, alias="e").eq_int("werksreal", "plant_id", 1202)
+    assert w.sql == "e.werksreal = %(plant_id)s"
+    assert w.params == {"plant_id": "1202"}
+    # El modo legacy ignora la verificación
+    assert Where(ETLIST, alias="e", legacy=True).eq_int("werksreal", "plant_id", 1202).sql.startswith("CAST(")
+
+
+def test_native_column_is_always_raw():
+    w = Where(TELEMEDICION).in_ints("protucto", [1, 4])
+    assert w.sql == "protucto IN (1,4)"
+    assert Where(TELEMEDICION, legacy=True).in_ints("protucto", [1, 4]).sql == "protucto IN (1,4)"
+
+
+def test_in_ints_on_text_column():
+    assert Where(PREDICCION).in_ints("producto", [1, 4]).sql == "CAST(producto AS INTEGER) IN (1,4)"
+    with raw_predicates():
+        assert Where(PREDICCION).in_ints("producto", [1, 4]).sql == "producto IN ('1','4')"
+
+
+def test_in_select_raw_casts_subquery_instead_of_column():
+    with raw_predicates():
+        w = Where(TELEMEDICION).in_select("ubicacioncodigo", "SELECT client_id FROM st")
+    assert w.sql == "ubicacioncodigo IN (SELECT CAST(x AS VARCHAR) FROM (SELECT client_id FROM st) AS s(x))"
+
+
+def test_epoch_range_legacy_and_raw():
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 2)
+    legacy = Where(TELEMEDICION, prefix="t_").epoch_range("fechaultimalect", "lectura", start, end)
+    assert legacy.sql == (
+        "try_cast(fechaultimalect AS bigint) >= %(t_lectura_from)s\n"
+        "    AND try_cast(fechaultimalect AS bigint) <= %(t_lectura_to)s"
+    )
+    assert legacy.params == {"t_lectura_from": 1704067200, "t_lectura_to": 1704153600}
+
+    with raw_predicates():
+        raw = Where(TELEMEDICION, prefix="t_").epoch_range("fechaultimalect", "lectura", start, end)
+    assert raw.sql == "fechaultimalect >= %(t_lectura_from)s\n    AND fechaultimalect <= %(t_lectura_to)s"
+    assert raw.params == {"t_lectura_from": "1704067200", "t_lectura_to": "1704153600"}
+
+
+def test_date_range_on_date_varchar():
+    d0, d1 = date(2024, 1, 1), date(2024, 3, 31)
+    w = Where(ETLIST, alias="e").date_range("vdatu", "vdatu", d0, d1)
+    assert w.sql == "try_cast(e.vdatu AS DATE) BETWEEN DATE(%(vdatu_from)s) AND DATE(%(vdatu_to)s)"
+    with raw_predicates():
+        w = Where(ETLIST, alias="e").date_range("vdatu", "vdatu", start=d0)
+    assert w.sql == "e.vdatu >= %(vdatu_from)s"
+    assert w.params == {"vdatu_from": "2024-01-01"}
+
+
+def test_date_range_on_native_timestamp():
+    w = Where(PREDICCION).date_range("fecha", "fecha", end=date(2024, 1, 31))
+    assert w.sql == "fecha <= DATE(%(fecha_to)s)"
+
+
+def test_partition_filter_only_outside_legacy(monkeypatch):
+    monkeypatch.setattr(sql, "_DATE_PARTITIONS", {PREDICCION.name: "dt"})
+    d0, d1 = date(2024, 1, 1), date(2024, 1, 31)
+    w = Where(PREDICCION).date_range("fecha", "fecha", d0, d1)
+    assert "dt >= %(fecha_pfrom)s" in w.sql and "dt <= %(fecha_pto)s" in w.sql
+    assert w.params["fecha_pfrom"] == "2024-01-01" and w.params["fecha_pto"] == "2024-01-31"
+    legacy = Where(PREDICCION, legacy=True).date_range("fecha", "fecha", d0, d1)
+    assert "dt" not in legacy.sql
+
+
+def test_raw_predicates_for_some_columns_only():
+    with raw_predicates(["copecfuel_staging.telemedicion_detalle.ubicacioncodigo"]):
+        w = (
+            Where(TELEMEDICION)
+            .eq_int("ubicacioncodigo", "cid", 10080)
+            .epoch_range("fechaultimalect", "lectura", start=0)
+        )
+    assert "ubicacioncodigo = %(cid)s" in w.sql
+    assert "try_cast(fechaultimalect AS bigint)" in w.sql
+
+
+def test_tracking_columns_records_text_columns_only():
+    with tracking_columns() as used:
+        Where(TELEMEDICION).in_ints("protucto", [1]).eq_int("ubicacioncodigo", "cid", 1)
+    assert used == {"copecfuel_staging.telemedicion_detalle.ubicacioncodigo"}
+
+
+def test_literals_are_escaped():
+    assert Where(ETLIST).in_strs("auart", ["ZC01", "O'X"]).sql == "auart IN ('ZC01', 'O''X')"
+
+
+def test_empty_where_and_merge_params():
+    a = Where(ETLIST, prefix="a_").eq_int("kunag", "cid", 1)
+    b = Where(ETLIST, prefix="b_").eq_int("kunag", "cid", 2)
+    assert Where(ETLIST).sql == "TRUE"
+    assert merge_params(a, b, plant_id=3) == {"a_cid": 1, "b_cid": 2, "plant_id": 3}
+
+
+def test_months_ago_clamps_end_of_month():
+    assert months_ago(date(2024, 5, 31), 3) == date(2024, 2, 29)
+    assert months_ago(date(2024, 1, 15), 1) == date(2023, 12, 15)
@@ -0,0 +1,99 @@
+# backend/tests/test_station_delta.py
+import pytest
+from starlette.responses import Response
+
+from app.deps.cache import MemoryBackend, set_cache_backend
+from app.routers import stations
+from app.routers.stations import VERSION_HEADER, _diff, _fingerprints, list_plant_stations
+from app.schemas.station import Station, StationDelta
+
+
+def _st(client_id: int, truck: str = "T1", name: str = "EDS") -> Station:
+    return Station(plant_id=1202, client_id=client_id, client_description=name, truck_type=truck)
+
+
+BASE = [_st(1), _st(2), _st(2, truck="T2"), _st(3)]
+
+
+def test_fingerprints_ignore_row_order():
+    v1, fps1 = _fingerprints(BASE)
+    v2, fps2 = _fingerprints(list(reversed(BASE)))
+    assert v1 == v2 and fps1 == fps2
+    assert set(fps1) == {1, 2, 3}
+
+
+def test_fingerprint_covers_every_row_of_a_station():
+    _, before = _fingerprints(BASE)
+    _, after = _fingerprints([_st(1), _st(2), _st(2, truck="T3"), _st(3)])
+    assert before[1] == after[1] and before[3] == after[3]
+    assert before[2] != after[2]
+
+
+def test_diff():
+    prev = {1: "a", 2: "b", 3: "c"}
+    cur = {1: "a", 2: "B", 4: "d"}
+    added, changed, removed = _diff(prev, cur)
+    assert added == {4}
+    assert changed == {2}
+    assert removed == [3]
+    assert _diff(cur, cur) == (set(), set(), [])
+
+
+@pytest.fixture
+def plant(monkeypatch):
+    set_cache_backend(MemoryBackend(max_bytes=1024 * 1024))
+    data = {"rows": list(BASE), "queries": 0}
+
+    def fake_query(plant_id):
+        data["queries"] += 1
+        return list(data["rows"])
+
+    monkeypatch.setattr(stations, "_query_plant_stations", fake_query)
+    monkeypatch.setattr(stations, "track_plant_usage", lambda plant_id: None)
+    return data
+
+
+def _call(since=None):
+    response = Response()
+    body = list_plant_stations(response, plant_id=1202, since=since)
+    return body, response.headers[VERSION_HEADER]
+
+
+def test_full_list_then_unchanged_since_skips_the_view(plant, monkeypatch):
+    body, version = _call()
+    assert body == BASE and plant["queries"] == 1
+
+    # Con la versión vigente en cache, 'since' sin cambios no lee la lista
+    monkeypatch.setattr(stations, "_plant_stations_view", lambda plant_id: pytest.fail("view loaded"))
+    delta, v2 = _call(since=version)
+    assert isinstance(delta, StationDelta)
+    assert v2 == version
+    assert not (delta.full or delta.added or delta.changed or delta.removed)
+
+
+def test_delta_after_change(plant):
+    _, old_version = _call()
+    plant["rows"] = [_st(1, name="EDS renombrada"), _st(3), _st(4)]
+    # Vence la lista cacheada; las huellas de la versión anterior siguen disponibles
+    cache = stations.get_cache()
+    cache.delete(cache.make_key("plant_stations_view", 1202))
+    cache.delete(stations._version_key(1202))
+    delta, version = _call(since=old_version)
+    assert version != old_version
+    assert [s.client_id for s in delta.changed] == [1]
+    assert [s.client_id for s in delta.added] == [4]
+    assert delta.removed == [2]
+    assert not delta.full
+
+
+def test_unknown_since_returns_full_list(plant):
+    delta, _ = _call(since="no-such-version")
+    assert delta.full
+    assert delta.added == BASE
+
+
+def test_view_is_built_once_per_ttl(plant):
+    _call()
+    _call(since="no-such-version")
+    _call()
+    assert plant["queries"] == 1
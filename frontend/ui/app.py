@@ -3,9 +3,12 @@ from __future__ import annotations
 import os
 import pandas as pd
 import streamlit as st
-from services.data import fetch_plants, fetch_stations
+from services.data import (
+    fetch_plants, fetch_stations, fetch_plant_dashboard, prefetch_station_details, refresh_all, search_stations,
+)
 from utils.formatting import fmt_plant_label
-from components.station_card import render_station_card
+from components.station_grid import visible_slice, render_station_grid, render_station_table
+from dialogs.station_details import show_station_dialog
 
 # Configuración de página
 st.set_page_config(page_title="JPP – Planificador", page_icon="⛽", layout="wide")
@@ -26,12 +29,37 @@ Bienvenida/o a **JPP App**. Este prototipo permite:
 - Seleccionar EDS, ver clientes asociados y, en siguientes pasos, configurar restricciones y ejecutar la optimización.
 """)
 
+# Refresco manual del cache de datos (memoria + disco)
+with st.sidebar:
+    if st.button("🔄 Actualizar datos", use_container_width=True):
+        refresh_all()
+        st.rerun()
+    st.caption("Los datos se guardan en cache: plantas 24 h, estaciones 10 min (sólo cambios), telemetría 5 min.")
+
+    # Búsqueda en toda la red (sin conocer la planta)
+    st.divider()
+    net_q = st.text_input("Buscar estación en toda la red", placeholder="Código, razón social o zona").strip()
+    if net_q:
+        try:
+            hits = search_stations(net_q)
+        except Exception as e:
+            hits = []
+            st.error(f"No se pudo buscar: {e}")
+        if not hits:
+            st.caption("Sin resultados.")
+        for h in hits:
+            label = f"{h.get('client_id')} – {h.get('client_description') or '—'}"
+            st.caption(f"Planta {h.get('plant_id')} · {h.get('zone_name') or 'Zona no especificada'}")
+            if st.button(label, key=f"net_{h.get('plant_id')}_{h.get('client_id')}", use_container_width=True):
+                show_station_dialog(h)
+
 st.divider()
 st.markdown("### 1) Selecciona una planta")
 
 # Selector de planta
 try:
-    df_plants = fetch_plants()
+    with st.spinner("Cargando plantas..."):
+        df_plants = fetch_plants()
     if df_plants.empty or "plant_id" not in df_plants.columns:
         st.warning("No se encontraron plantas o el formato no es el esperado.")
         st.stop()
@@ -73,6 +101,44 @@ with k2:
 with k3:
     st.metric("Planta", str(selected_plant_name or selected_plant_id))
 
+# Estaciones en riesgo (autonomía calculada en bloque por el backend).
+# Sólo se consulta a pedido: el cuerpo de un expander colapsado igual se
+# ejecuta en cada rerun y estas queries abarcan toda la planta.
+with st.expander("Estaciones con menor autonomía", expanded=False):
+    dash = None
+    if st.toggle("Calcular autonomía de la planta", key=f"plant_dashboard_{selected_plant_id}"):
+        try:
+            with st.spinner("Calculando autonomía..."):
+                dash = fetch_plant_dashboard(selected_plant_id)
+        except Exception as e:
+            st.error(f"No se pudo cargar la autonomía de la planta: {e}")
+    else:
+        st.caption("Activa el cálculo para consultar stock y demanda de todas las estaciones de la planta.")
+
+    if dash:
+        risk_rows = [
+            {
+                "Estación": s.get("client_id"),
+                "Razón social": s.get("client_description"),
+                "Producto crítico": s.get("critical_product"),
+                "Autonomía (días)": s.get("min_autonomy_days"),
+            }
+            for s in dash.get("stations", [])
+            if s.get("min_autonomy_days") is not None
+        ]
+        if risk_rows:
+            st.dataframe(
+                pd.DataFrame(risk_rows),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "Estación": st.column_config.NumberColumn("Estación", format="%d"),
+                    "Autonomía (días)": st.column_config.NumberColumn("Autonomía (días)", format="%.1f"),
+                },
+            )
+        else:
+            st.caption("Sin lecturas de stock o demanda para calcular autonomía.")
+
 st.write("")
 
 # Buscador + grid
@@ -87,7 +153,25 @@ def _match(rec: dict, needle: str) -> bool:
 filtered = [r for r in stations if _match(r, search)] if search else stations
 filtered = sorted(filtered, key=lambda r: (int(r.get("client_id") or 0), str(r.get("client_description") or "").lower()))
 
-n_cols = 3
-cols = st.columns(n_cols)
-for i, stn in enumerate(filtered):
-    render_station_card(cols[i % n_cols], stn, i)
+# Vista: tarjetas paginadas o tabla compacta (el costo del rerun depende del
+# tamaño de página, no de la cantidad de estaciones de la planta)
+c_view, c_page = st.columns([2, 1])
+with c_view:
+    view_mode = st.radio("Vista", ["Tarjetas", "Tabla"], horizontal=True, key="stations_view")
+with c_page:
+    page_size = st.selectbox("Tarjetas por página", [12, 24, 48], index=0, key="stations_page_size",
+                             disabled=(view_mode == "Tabla"))
+
+if view_mode == "Tabla":
+    visible = filtered
+else:
+    visible = visible_slice(filtered, int(page_size), (selected_plant_id, search, int(page_size)))
+
+# Precarga especulativa del detalle de las primeras estaciones visibles
+# (al acotar la búsqueda, las que quedan son justamente las candidatas)
+prefetch_station_details([int(r["client_id"]) for r in visible if r.get("client_id") is not None])
+
+if view_mode == "Tabla":
+    render_station_table(filtered)
+else:
+    render_station_grid(filtered, visible, int(page_size))
@@ -0,0 +1,68 @@
+# frontend/ui/components/station_grid.py
+from __future__ import annotations
+import pandas as pd
+import streamlit as st
+from typing import Dict, List
+from components.station_card import render_station_card
+from dialogs.station_details import show_station_dialog
+
+
+def visible_slice(stations: List[Dict], page_size: int, signature: tuple) -> List[Dict]:
+    """
+    Estaciones a dibujar en modo tarjetas con carga incremental ("Cargar más").
+    El límite vuelve a una página cuando cambia 'signature' (planta, búsqueda, tamaño).
+    """
+    if st.session_state.get("grid_signature") != signature:
+        st.session_state["grid_signature"] = signature
+        st.session_state["grid_limit"] = page_size
+    return stations[: st.session_state["grid_limit"]]
+
+
+def render_station_grid(stations: List[Dict], visible: List[Dict], page_size: int, n_cols: int = 3) -> None:
+    """Grid de tarjetas: sólo 'visible' genera widgets; el resto queda tras 'Cargar más'."""
+    cols = st.columns(n_cols)
+    for i, stn in enumerate(visible):
+        render_station_card(cols[i % n_cols], stn, i)
+
+    remaining = len(stations) - len(visible)
+    st.caption(f"Mostrando {len(visible)} de {len(stations)} estaciones")
+    if remaining > 0:
+        if st.button(f"Cargar más ({min(page_size, remaining)} de {remaining} restantes)", use_container_width=True):
+            st.session_state["grid_limit"] = len(visible) + page_size
+            st.rerun()
+
+
+def render_station_table(stations: List[Dict]) -> None:
+    """Modo compacto: una sola tabla; seleccionar una fila abre el diálogo de la estación."""
+    tdf = pd.DataFrame(
+        [
+            {
+                "Estación": s.get("client_id"),
+                "Razón social": s.get("client_description"),
+                "Zona": s.get("zone_name") or s.get("zone_id"),
+                "Jefe de zona": s.get("zone_manager_name"),
+            }
+            for s in stations
+        ]
+    )
+    event = st.dataframe(
+        tdf,
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="stations_table",
+        column_config={
+            "Estación": st.column_config.NumberColumn("Estación", format="%d", width="small"),
+        },
+    )
+    rows = list(getattr(getattr(event, "selection", None), "rows", []) or [])
+    if not rows or rows[0] >= len(stations):
+        st.session_state.pop("stations_table_opened", None)
+        return
+
+    # Abrir sólo cuando cambia la selección (no en cada rerun con la fila marcada)
+    stn = stations[rows[0]]
+    if st.session_state.get("stations_table_opened") != stn.get("client_id"):
+        st.session_state["stations_table_opened"] = stn.get("client_id")
+        show_station_dialog(stn)
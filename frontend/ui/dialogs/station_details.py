@@ -7,7 +7,7 @@ import streamlit as st
 import requests
 from datetime import timedelta
 
-from services.data import fetch_telemetry_summary, fetch_demand_curve
+from services.data import fetch_demand_curve, fetch_telemetry_history, fetch_station_details_async
 from utils.formatting import fmt_num
 from utils.assets import load_asset_text
 
@@ -36,10 +36,17 @@ def show_station_dialog(station: Dict):
     # ---------------------------------------------------------------------
     state_prefix = f"demand_{cid}"
 
+    # Demanda (sólo la 1ª vez) y telemetría se piden en paralelo: la telemetría
+    # se descarga mientras se dibuja la sección de demanda
+    pending = fetch_station_details_async(
+        cid, demand=f"{state_prefix}_loaded" not in st.session_state
+    )
+
     # 1) Cargar defaults una sola vez
     if f"{state_prefix}_loaded" not in st.session_state:
         try:
-            d0 = fetch_demand_curve(cid)  # defaults server-side
+            with st.spinner("Obteniendo curva de demanda…"):
+                d0 = pending["demand"].result()  # defaults server-side
         except requests.HTTPError as http_err:
             status = getattr(http_err.response, "status_code", "?")
             url = getattr(http_err.response, "url", "desconocida")
@@ -202,7 +209,7 @@ def show_station_dialog(station: Dict):
     # ---------------------------------------------------------------------
     with st.spinner("Obteniendo capacidades y lecturas…"):
         try:
-            data = fetch_telemetry_summary(cid)
+            data = pending["telemetry"].result()
         except requests.HTTPError as http_err:
             status = getattr(http_err.response, "status_code", "?")
             url = getattr(http_err.response, "url", "desconocida")
@@ -296,3 +303,48 @@ def show_station_dialog(station: Dict):
                         )
                     else:
                         st.caption("Sin detalle de tanques.")
+
+    st.divider()
+
+    # ---------------------------------------------------------------------
+    # SECCIÓN C: HISTORIAL DE VOLUMEN POR TANQUE (serie reducida server-side)
+    # ---------------------------------------------------------------------
+    st.markdown("#### Historial de volumen por tanque (m³)")
+    days = st.radio(
+        "Rango",
+        options=[7, 14, 30],
+        index=1,
+        format_func=lambda d: f"{d} días",
+        horizontal=True,
+        key=f"history_{cid}_days",
+    )
+    try:
+        hist = fetch_telemetry_history(cid, days=int(days))
+    except Exception as e:
+        st.error(f"No se pudo cargar el historial: {e}")
+        return
+
+    rows = [
+        {"Fecha": pt["ts"], "Tanque": f"TK {t['tank_id']} – {t.get('product_name') or '—'}", "m3": pt["volume_m3"]}
+        for t in (hist or {}).get("tanks", [])
+        for pt in t.get("points", [])
+    ]
+    if not rows:
+        st.info("Sin lecturas en el rango seleccionado.")
+        return
+
+    import altair as alt
+    hdf = pd.DataFrame(rows)
+    hdf["Fecha"] = pd.to_datetime(hdf["Fecha"])
+    hchart = (
+        alt.Chart(hdf)
+        .mark_line()
+        .encode(
+            x=alt.X("Fecha:T", title=None),
+            y=alt.Y("m3:Q", title="m³"),
+            color=alt.Color("Tanque:N", legend=alt.Legend(title="Tanque")),
+        )
+        .properties(height=260)
+        .interactive(bind_y=False)
+    )
+    st.altair_chart(hchart, use_container_width=True)
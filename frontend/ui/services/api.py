@@ -1,20 +1,146 @@
 # frontend/ui/services/api.py
 from __future__ import annotations
-import os, time, requests, streamlit as st
-from typing import Any, Dict, Optional
+import os, time, random, logging, threading, requests, streamlit as st
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, Dict, Iterator, Optional
 
 # Configuración de backend (secrets/env)
 BACKEND_URL: str = st.secrets.get("BACKEND_URL", os.getenv("BACKEND_URL", "http://localhost:8000"))
 API_KEY: Optional[str] = st.secrets.get("API_KEY", os.getenv("API_KEY"))
 
+# Pool keep-alive compartido y tope de requests simultáneas al backend
+POOL_SIZE: int = int(os.getenv("API_POOL_SIZE", "16"))
+MAX_CONCURRENCY: int = int(os.getenv("API_MAX_CONCURRENCY", "6"))
+# De ese tope, cuántas puede ocupar la precarga especulativa (el resto queda para el usuario)
+BACKGROUND_CONCURRENCY: int = max(1, min(MAX_CONCURRENCY - 1, int(os.getenv("API_BACKGROUND_CONCURRENCY", "2"))))
+
+# El backend admite las requests marcadas así con la prioridad más baja
+PRIORITY_HEADER = "X-Request-Priority"
+
+# Fallas transitorias que vale la pena reintentar (GET es idempotente)
+RETRY_STATUS = {429, 502, 503, 504}
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+log = logging.getLogger("jpp.api")
+
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_background_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+# Cupos de requests en vuelo por proceso (todas las vías: api_get y submit)
+_slots = threading.BoundedSemaphore(MAX_CONCURRENCY)
+_background_slots = threading.BoundedSemaphore(BACKGROUND_CONCURRENCY)
+_background: ContextVar[bool] = ContextVar("api_background", default=False)
+
+
+def get_session() -> requests.Session:
+    """Sesión HTTP única por proceso: reutiliza conexiones TCP/TLS entre reruns y usuarios."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                if API_KEY:
+                    s.headers["X-API-Key"] = API_KEY
+                _session = s
+    return _session
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="jpp-api")
+    return _executor
+
+
+def _get_background_executor() -> ThreadPoolExecutor:
+    global _background_executor
+    if _background_executor is None:
+        with _lock:
+            if _background_executor is None:
+                _background_executor = ThreadPoolExecutor(
+                    max_workers=BACKGROUND_CONCURRENCY, thread_name_prefix="jpp-api-bg"
+                )
+    return _background_executor
+
+
+@contextmanager
+def background_requests() -> Iterator[None]:
+    """Las requests hechas en este contexto son especulativas (precarga): prioridad baja."""
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+
+@contextmanager
+def _slot() -> Iterator[None]:
+    if not _background.get():
+        with _slots:
+            yield
+        return
+    with _background_slots, _slots:
+        yield
+
+
+def submit(fn: Callable[..., Any], *args: Any, background: bool = False) -> Future:
+    """
+    Ejecuta fn(*args) (típicamente una función fetch_* cacheada) en el pool
+    compartido. Con background=True corre en el pool de precarga y sus
+    requests van marcadas como especulativas.
+    """
+    if not background:
+        return _get_executor().submit(fn, *args)
+
+    def _run() -> Any:
+        with background_requests():
+            return fn(*args)
+
+    return _get_background_executor().submit(_run)
+
+
+def _backoff(attempt: int, resp: Optional[requests.Response] = None, base: float = 0.5, cap: float = 8.0) -> float:
+    """Espera exponencial con jitter completo; respeta Retry-After si el backend lo envía."""
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(cap, float(retry_after))
+            except ValueError:
+                pass
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
 def api_get(path: str, params: Optional[Dict[str, Any]] = None, retries: int = 2, timeout: int = 30) -> requests.Response:
-    """GET con reintentos y header de API Key."""
-    headers = {"X-API-Key": API_KEY} if API_KEY else {}
+    """GET con pool keep-alive, reintentos (backoff exponencial con jitter) y header de API Key."""
     url = f"{BACKEND_URL.rstrip('/')}/{path.lstrip('/')}"
+    session = get_session()
+    headers = {PRIORITY_HEADER: "background"} if _background.get() else None
     for i in range(retries + 1):
+        t0 = time.perf_counter()
         try:
-            return requests.get(url, params=params, headers=headers, timeout=timeout)
-        except requests.exceptions.RequestException:
+            with _slot():
+                r = session.get(url, params=params, headers=headers, timeout=timeout)
+        except RETRY_EXCEPTIONS as e:
+            log.warning("GET %s failed in %.0f ms (attempt %d): %s", path, (time.perf_counter() - t0) * 1000, i + 1, e)
             if i == retries:
                 raise
-            time.sleep(1 + i)
+            time.sleep(_backoff(i))
+            continue
+        log.info("GET %s -> %s in %.0f ms (attempt %d)", path, r.status_code, (time.perf_counter() - t0) * 1000, i + 1)
+        if r.status_code in RETRY_STATUS and i < retries:
+            time.sleep(_backoff(i, r))
+            continue
+        return r
+    raise RuntimeError("unreachable")
+
@@ -0,0 +1,253 @@
+# frontend/ui/services/cache.py
+from __future__ import annotations
+import copy, functools, hashlib, inspect, logging, os, pickle, sqlite3, tempfile, threading, time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Directorio del tier en disco (sobrevive reinicios/redeploys del proceso Streamlit)
+CACHE_DIR: str = os.getenv("JPP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "jpp_ui_cache"))
+
+log = logging.getLogger("jpp.cache")
+
+MISS = object()
+_registry: List["TTLStore"] = []
+
+# Grupo de single-flight: una llamada sólo espera a otra en vuelo del mismo grupo
+_flight: ContextVar[str] = ContextVar("cache_flight", default="")
+
+
+@contextmanager
+def separate_flight(group: str) -> Iterator[None]:
+    """
+    Las llamadas @cached de este contexto no comparten el cálculo en vuelo con
+    las de fuera (p. ej. la precarga): el diálogo que el usuario abre no espera
+    detrás de una request de segundo plano a la que el backend da menos prioridad.
+    """
+    token = _flight.set(group)
+    try:
+        yield
+    finally:
+        _flight.reset(token)
+
+
+class _DiskStore:
+    """Tabla SQLite compartida: (namespace, key) -> valor pickle con expiración."""
+
+    # Un hit renueva accessed_at (orden LRU) a lo más una vez por este intervalo (s)
+    TOUCH_INTERVAL = 30.0
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace   TEXT NOT NULL,
+                key         TEXT NOT NULL,
+                value       BLOB NOT NULL,
+                expires_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Tuple[Any, float]:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, now),
+        ).fetchone()
+        if row is None:
+            return MISS, 0.0
+        if now - row[2] > self.TOUCH_INTERVAL:
+            try:
+                conn.execute(
+                    "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+                )
+            except sqlite3.OperationalError:
+                pass  # base ocupada: se sirve el hit igual
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, namespace: str, key: str, value: Any, expires_at: float, max_entries: int) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries(namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, sqlite3.Binary(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)), expires_at, now),
+        )
+        # Expiradas fuera y, por función, sólo las 'max_entries' más recientes
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        conn.execute(
+            """
+            DELETE FROM entries WHERE namespace = ? AND key NOT IN (
+                SELECT key FROM entries WHERE namespace = ? ORDER BY accessed_at DESC LIMIT ?
+            )
+            """,
+            (namespace, namespace, max_entries),
+        )
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        if namespace is None:
+            self._conn().execute("DELETE FROM entries")
+        else:
+            self._conn().execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+
+_disk: Optional[_DiskStore] = None
+_disk_lock = threading.Lock()
+
+
+def _get_disk() -> Optional[_DiskStore]:
+    global _disk
+    if _disk is None:
+        with _disk_lock:
+            if _disk is None:
+                try:
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    _disk = _DiskStore(os.path.join(CACHE_DIR, "cache.sqlite3"))
+                except Exception as e:
+                    log.warning("disk cache unavailable: %s", e)
+                    return None
+    return _disk
+
+
+class TTLStore:
+    """LRU en memoria con TTL por namespace + tier en disco opcional."""
+
+    def __init__(self, namespace: str, ttl: float, max_entries: int, persist: bool):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist = persist
+        self._mem: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Locks de single-flight sólo mientras alguien los usa: [lock, usuarios]
+        self._key_locks: Dict[str, list] = {}
+
+    def get(self, key: str) -> Any:
+        now = time.time()
+        with self._lock:
+            item = self._mem.get(key)
+            if item is not None:
+                if item[0] > now:
+                    self._mem.move_to_end(key)
+                    return item[1]
+                del self._mem[key]
+        if self.persist and (disk := _get_disk()) is not None:
+            try:
+                value, expires_at = disk.get(self.namespace, key)
+            except Exception:
+                value = MISS
+            if value is not MISS:
+                self._remember(key, value, expires_at)
+                return value
+        return MISS
+
+    def set(self, key: str, value: Any) -> None:
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        if self.persist and (disk := _get_disk()) is not None:
+            try:
+                disk.set(self.namespace, key, value, expires_at, self.max_entries)
+            except Exception as e:
+                log.warning("disk cache set failed for %s: %s", self.namespace, e)
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._mem[key] = (expires_at, value)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    @contextmanager
+    def key_lock(self, key: str) -> Iterator[None]:
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+        if self.persist and (disk := _get_disk()) is not None:
+            disk.clear(self.namespace)
+
+
+class _FunctionCache(TTLStore):
+    """TTLStore cuya clave son los argumentos de la función decorada."""
+
+    def __init__(self, fn: Callable, ttl: float, max_entries: int, persist: bool):
+        super().__init__(f"{fn.__module__}.{fn.__qualname__}", ttl, max_entries, persist)
+        self.fn = fn
+        self._sig = inspect.signature(fn)
+
+    def key_for(self, args: tuple, kwargs: dict) -> str:
+        # Se aplican defaults para que f(1) y f(1, weeks=8) compartan entrada
+        bound = self._sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return hashlib.sha256(repr(sorted(bound.arguments.items())).encode("utf-8")).hexdigest()
+
+
+def cached(ttl: float, max_entries: int = 128, persist: bool = True):
+    """
+    Reemplazo de @st.cache_data con TTL, tope de entradas (LRU) y tier en disco.
+    Como st.cache_data, retorna una copia del valor para que el llamador pueda
+    mutarlo sin ensuciar el cache. Es thread-safe (usable desde precargas en
+    segundo plano) y calcula cada clave una sola vez aunque la pidan varios hilos.
+    """
+    def decorator(fn: Callable) -> Callable:
+        fc = _FunctionCache(fn, ttl=ttl, max_entries=max_entries, persist=persist)
+        _registry.append(fc)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = fc.key_for(args, kwargs)
+            value = fc.get(key)
+            if value is MISS:
+                with fc.key_lock(f"{_flight.get()}:{key}"):
+                    value = fc.get(key)
+                    if value is MISS:
+                        value = fn(*args, **kwargs)
+                        fc.set(key, value)
+            return copy.deepcopy(value)
+
+        wrapper.clear = fc.clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
+
+
+def keyed_store(namespace: str, ttl: float, max_entries: int = 64, persist: bool = True) -> TTLStore:
+    """Almacén clave/valor con las mismas garantías que @cached (p. ej. snapshots para sync incremental)."""
+    store = TTLStore(namespace, ttl=ttl, max_entries=max_entries, persist=persist)
+    _registry.append(store)
+    return store
+
+
+def clear_all() -> None:
+    """Vacía memoria y disco de todas las funciones cacheadas (botón 'Actualizar datos')."""
+    for fc in _registry:
+        fc.clear()
+    if (disk := _get_disk()) is not None:
+        disk.clear()
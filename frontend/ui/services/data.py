@@ -1,10 +1,28 @@
 # frontend/ui/services/data.py
 from __future__ import annotations
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import Future
+from typing import Dict, Iterable
 import pandas as pd
-import streamlit as st
-from .api import api_get
+from .api import api_get, submit
+from .cache import MISS, cached, clear_all, keyed_store, separate_flight
 
-@st.cache_data(show_spinner=True)
+# TTL por función (segundos): plantas casi estáticas, telemetría cambia seguido
+PLANTS_TTL = 24 * 3600
+STATIONS_TTL = 10 * 60      # barato: sólo trae el delta desde la versión previa
+SNAPSHOT_TTL = 7 * 24 * 3600
+DEMAND_TTL = 6 * 3600
+TELEMETRY_TTL = 5 * 60
+
+PREFETCH_STATIONS: int = int(os.getenv("PREFETCH_STATIONS", "6"))
+_PREFETCH_TTL_S = 300
+_prefetched: Dict[int, float] = {}
+_prefetch_lock = threading.Lock()
+
+@cached(ttl=PLANTS_TTL, max_entries=4)
 def fetch_plants() -> pd.DataFrame:
     """Obtiene la lista de plantas desde el backend."""
     r = api_get("plants", timeout=30)
@@ -19,21 +37,55 @@ def fetch_plants() -> pd.DataFrame:
         df = df.sort_values(by=["plant_name", "plant_id"], na_position="last", kind="mergesort")
     return df.reset_index(drop=True)
 
-@st.cache_data(show_spinner=True)
+# Última lista conocida por planta: {"version": str, "by_client": {client_id: [filas]}}
+_station_snapshots = keyed_store("stations_snapshot", ttl=SNAPSHOT_TTL, max_entries=64)
+
+def _apply_station_delta(by_client: Dict[int, list], delta: dict) -> Dict[int, list]:
+    """Aplica un delta de /plant-stations?since=… (las filas de cada estación se reemplazan completas)."""
+    if delta.get("full"):
+        by_client = {}
+    else:
+        by_client = dict(by_client)
+        for cid in delta.get("removed", []):
+            by_client.pop(int(cid), None)
+    upserts: Dict[int, list] = {}
+    for rec in (delta.get("added") or []) + (delta.get("changed") or []):
+        upserts.setdefault(int(rec["client_id"]), []).append(rec)
+    by_client.update(upserts)
+    return by_client
+
+@cached(ttl=STATIONS_TTL, max_entries=64)
 def fetch_stations(plant_id: int):
-    """Retorna estaciones asociadas a la planta (últimos 3 meses)."""
-    r = api_get("plant-stations", params={"plant_id": plant_id}, timeout=60)
-    r.raise_for_status()
-    return r.json()
+    """
+    Retorna estaciones asociadas a la planta (últimos 3 meses).
+    Si ya hay una versión previa, pide sólo los cambios (since=<versión>).
+    """
+    key = str(plant_id)
+    snap = _station_snapshots.get(key)
+    if snap is not MISS:
+        r = api_get("plant-stations", params={"plant_id": plant_id, "since": snap["version"]}, timeout=60)
+        r.raise_for_status()
+        delta = r.json()
+        by_client = _apply_station_delta(snap["by_client"], delta)
+        version = delta.get("version")
+    else:
+        r = api_get("plant-stations", params={"plant_id": plant_id}, timeout=60)
+        r.raise_for_status()
+        by_client = _apply_station_delta({}, {"full": True, "added": r.json()})
+        version = r.headers.get("X-Stations-Version")
 
-@st.cache_data(show_spinner=True)
+    if version:
+        _station_snapshots.set(key, {"version": version, "by_client": by_client})
+    return [rec for cid in sorted(by_client) for rec in by_client[cid]]
+
+@cached(ttl=TELEMETRY_TTL, max_entries=256)
 def fetch_telemetry_summary(client_id: int):
     """Resumen de telemetría por estación (capacidades, stock inicial y tanques)."""
     r = api_get("telemetry/summary", params={"client_id": client_id}, timeout=60)
     r.raise_for_status()
     return r.json()
 
-@st.cache_data(show_spinner=True)
+@cached(ttl=DEMAND_TTL, max_entries=256)
 def fetch_demand_curve(client_id: int, start_date: str | None = None, weeks: int = 8):
     params = {"client_id": client_id, "weeks": weeks}
     if start_date:
@@ -41,3 +93,75 @@ def fetch_demand_curve(client_id: int, start_date: str | None = None, weeks: int
     r = api_get("demand/curve", params=params, timeout=60)
     r.raise_for_status()
     return r.json()
+
+@cached(ttl=TELEMETRY_TTL, max_entries=128)
+def fetch_telemetry_history(client_id: int, days: int = 14, points: int = 300):
+    """Serie de volumen por tanque (ya reducida en el backend a ~'points' puntos)."""
+    end = datetime.now(timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+    r = api_get(
+        "telemetry/history",
+        params={"client_id": client_id, "start": start.isoformat(), "end": end.isoformat(), "points": points},
+        timeout=60,
+    )
+    r.raise_for_status()
+    return r.json()
+
+@cached(ttl=TELEMETRY_TTL, max_entries=32)
+def fetch_plant_dashboard(plant_id: int, horizon_days: int = 7):
+    """Autonomía (horas/días) por estación y producto, ordenada por urgencia."""
+    r = api_get(f"plants/{plant_id}/dashboard", params={"horizon_days": horizon_days}, timeout=90)
+    r.raise_for_status()
+    return r.json()
+
+
+def fetch_station_details_async(client_id: int, demand: bool = True, telemetry: bool = True) -> Dict[str, Future]:
+    """
+    Lanza en paralelo la curva de demanda (defaults) y el resumen de telemetría
+    de una estación. Retorna futures; .result() entrega el JSON o relanza el error.
+    """
+    out: Dict[str, Future] = {}
+    if demand:
+        out["demand"] = submit(fetch_demand_curve, client_id)
+    if telemetry:
+        out["telemetry"] = submit(fetch_telemetry_summary, client_id)
+    return out
+
+def _prefetch_one(client_id: int) -> None:
+    # Si el usuario abre la estación mientras tanto, el diálogo hace su propia
+    # request interactiva en vez de esperar a ésta
+    with separate_flight("background"):
+        for fn in (fetch_telemetry_summary, fetch_demand_curve):
+            try:
+                fn(client_id)
+            except Exception:
+                # especulativo: si falla, el diálogo reintenta y muestra el error
+                pass
+
+def prefetch_station_details(client_ids: Iterable[int], limit: int = PREFETCH_STATIONS) -> None:
+    """
+    Precarga en segundo plano (sin bloquear el rerun) el detalle de las primeras
+    estaciones visibles, para que abrir su diálogo sea instantáneo. Usa a lo más
+    API_BACKGROUND_CONCURRENCY cupos del tope compartido y el backend la admite
+    con la prioridad más baja: no compite con el diálogo que el usuario abrió.
+    """
+    now = time.monotonic()
+    with _prefetch_lock:
+        for cid in list(client_ids)[:limit]:
+            if now - _prefetched.get(cid, -_PREFETCH_TTL_S) < _PREFETCH_TTL_S:
+                continue
+            _prefetched[cid] = now
+            submit(_prefetch_one, cid, background=True)
+
+def refresh_all() -> None:
+    """Descarta todo lo cacheado (memoria y disco) y olvida las precargas hechas."""
+    clear_all()
+    with _prefetch_lock:
+        _prefetched.clear()
+
+@cached(ttl=60, max_entries=256, persist=False)
+def search_stations(q: str, limit: int = 20):
+    """Búsqueda de estaciones en toda la red (índice en memoria del backend)."""
+    r = api_get("stations/search", params={"q": q, "limit": limit}, timeout=30)
+    r.raise_for_status()
+    return r.json()